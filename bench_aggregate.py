@@ -0,0 +1,160 @@
+"""
+Đối chiếu tính trung bình qua các rating: vòng lặp gốc trong PokemonService (trước khi tách module,
+chép nguyên văn) so với modules/pokemon_modules/aggregate.py (aggregate_format, như lúc upload).
+Mục đích là kiểm tra output giống nhau và bản dùng chung không chậm hơn, không phải để tăng tốc:
+hai bản chạy xấp xỉ nhau (tỉ lệ thời gian dao động quanh 1.0x giữa các lần chạy).
+Section "Checks and Counters" không so sánh vì bản gốc đọc nhầm số trong tên đối thủ
+(vd. "Mr. Mime", "Porygon2"), counter_score đã sửa lỗi đó.
+
+    python bench_aggregate.py pokemon_data.json --format gen9ou
+    python bench_aggregate.py --synthetic 12      # format giả lập 12 rating
+"""
+import argparse
+import json
+import random
+import re
+import time
+from typing import Any, Callable, Dict, List
+
+from modules.pokemon_modules import aggregate
+
+# --- BẢN GỐC (chép nguyên văn từ PokemonService trước khi tách module) ---
+def legacy_weighted_average(pokemon: str, ratings: List[str], results: List[Dict[str, Any]]) -> Dict[str, Any]:
+    total_raw_count = sum(d.get("raw_count", 0) for d in results)
+    if total_raw_count == 0: total_raw_count = 1
+
+    agg_sections = {
+        "Moves": {}, "Abilities": {}, "Items": {}, 
+        "Spreads": {}, "Tera Types": {}, "Teammates": {}
+    }
+    agg_counters = {}
+
+    for data in results:
+        weight = data.get("raw_count", 0)
+        sections = data.get("sections", {})
+        for sec_name in agg_sections.keys():
+            for item in sections.get(sec_name, []):
+                name = item.get("name")
+                pct = item.get("pct", 0)
+                if name:
+                    if name not in agg_sections[sec_name]: agg_sections[sec_name][name] = 0.0
+                    agg_sections[sec_name][name] += (pct * weight)
+
+        for c in sections.get("Checks and Counters", []):
+            opp = c.get("opponent") or c.get("name")
+            if not opp: continue
+            raw = c.get("raw", "")
+            score = 0
+            match = re.search(r"([\d\.]+)", raw)
+            if match: score = float(match.group(1))
+            if opp not in agg_counters:
+                agg_counters[opp] = {"weighted_score": 0.0, "detail": c.get("detail", ""), "max_weight": 0}
+            agg_counters[opp]["weighted_score"] += (score * weight)
+            if weight > agg_counters[opp]["max_weight"]:
+                agg_counters[opp]["detail"] = c.get("detail", "")
+                agg_counters[opp]["max_weight"] = weight
+
+    final_sections = {}
+    for sec_name, name_map in agg_sections.items():
+        final_list = [{"name": name, "pct": val / total_raw_count} for name, val in name_map.items()]
+        final_list.sort(key=lambda x: x["pct"], reverse=True)
+        final_sections[sec_name] = final_list
+
+    final_counters = []
+    for opp, val in agg_counters.items():
+        final_counters.append({"opponent": opp, "pct": val["weighted_score"] / total_raw_count, "detail": val["detail"]})
+    final_counters.sort(key=lambda x: x["pct"], reverse=True)
+    final_sections["Checks and Counters"] = final_counters
+
+    return {
+        "name": pokemon,
+        "raw_count": total_raw_count,
+        "info": f"Weighted average from {len(results)} ratings ({', '.join(ratings)})",
+        "sections": final_sections
+    }
+
+# --- DATA ---
+def synthetic_format(n_ratings: int, n_pokemon: int = 300, seed: int = 1) -> Dict[str, Dict[str, Any]]:
+    """Format giả lập: mỗi rating có cùng tập Pokemon, mỗi section vài chục entry."""
+    rnd = random.Random(seed)
+    pool = [f"Mon{i}" for i in range(400)]
+    sizes = {"Abilities": 3, "Items": 15, "Spreads": 40, "Moves": 30, "Tera Types": 10, "Teammates": 60}
+    bucket = {}
+    for r in range(n_ratings):
+        rating = str(1000 + 100 * r)
+        bucket[rating] = {}
+        for p in range(n_pokemon):
+            sections = {sec: [{"name": f"{sec[:2]}{rnd.randrange(size * 2)}", "pct": round(rnd.uniform(0, 100), 3)}
+                              for _ in range(size)] for sec, size in sizes.items()}
+            sections["Checks and Counters"] = [{
+                "opponent": name, "raw": f"{name} {rnd.uniform(30, 90):.3f} ({rnd.uniform(50, 95):.2f}±{rnd.uniform(1, 5):.2f})",
+                "detail": f"({rnd.uniform(0, 60):.1f}% KOed / {rnd.uniform(0, 60):.1f}% switched out)",
+            } for name in rnd.sample(pool, 12)]
+            bucket[rating][f"Pokemon{p}"] = {"raw_count": rnd.randrange(1, 200000), "sections": sections}
+    return bucket
+
+def load_format(path: str, fmt: str) -> Dict[str, Dict[str, Any]]:
+    with open(path, "r", encoding="utf-8") as f:
+        data = json.load(f)["pokemon"]
+    if fmt not in data:
+        raise SystemExit(f"Không có format {fmt}. Có: {', '.join(sorted(data))[:500]}")
+    return {r: pokes for r, pokes in data[fmt].items() if r != aggregate.ALL_RATING}
+
+# --- BENCHMARK ---
+def run_format(fn: Callable, bucket: Dict[str, Dict[str, Any]]) -> Dict[str, Any]:
+    ratings = aggregate.sort_ratings(bucket.keys())
+    names = {}
+    for r in ratings: names.update(dict.fromkeys(bucket[r]))
+    out = {}
+    for pokemon in names:
+        results = [bucket[r][pokemon] for r in ratings if bucket[r].get(pokemon)]
+        out[pokemon] = fn(pokemon, ratings, results)
+    return out
+
+def best_time(fn: Callable, bucket: Dict[str, Dict[str, Any]], repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn(bucket)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Đối chiếu output / thời gian tính trung bình qua các rating.")
+    parser.add_argument("file", nargs="?", help="Output JSON của smogon_fetch")
+    parser.add_argument("--format", help="Format cần đo (vd. gen9ou)")
+    parser.add_argument("--synthetic", type=int, default=0, help="Dùng format giả lập với N rating")
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    if args.synthetic:
+        bucket = synthetic_format(args.synthetic)
+        label = f"synthetic ({args.synthetic} ratings)"
+    elif args.file and args.format:
+        bucket = load_format(args.file, args.format)
+        label = args.format
+    else:
+        parser.error("Cần file + --format, hoặc --synthetic N.")
+
+    n_pokemon = len({p for pokes in bucket.values() for p in pokes})
+    n_entries = sum(len(v) for pokes in bucket.values() for rec in pokes.values()
+                    for v in rec.get("sections", {}).values())
+
+    def usage_sections(out: Dict[str, Any]) -> Dict[str, Any]:
+        return {p: {sec: rec["sections"][sec] for sec in aggregate.AVG_SECTIONS} for p, rec in out.items()}
+    if usage_sections(run_format(legacy_weighted_average, bucket)) != usage_sections(aggregate.aggregate_format(bucket)):
+        print("[ERR] Output khác nhau!")
+
+    print(f"{label}: {len(bucket)} ratings, {n_pokemon} pokemon, {n_entries} entries")
+    impls = [
+        ("legacy", lambda b: run_format(legacy_weighted_average, b)),
+        ("shared", aggregate.aggregate_format),
+    ]
+    times = {}
+    for name, fn in impls:
+        times[name] = best_time(fn, bucket, args.repeat)
+        print(f"  {name:<8} {times[name] * 1000:>9.1f} ms  {n_entries / times[name]:>12,.0f} entries/s")
+    print(f"  shared / legacy time  {times['shared'] / times['legacy']:.2f}x")
+
+if __name__ == "__main__":
+    main()
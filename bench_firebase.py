@@ -0,0 +1,104 @@
+"""
+Benchmark đường dữ liệu của bot hoàn toàn offline:
+upload_firebase -> PokemonService.build_cache -> tra cứu (lần đầu / từ cache) -> autocomplete.
+Backend firebase chạy trên firebase_emulator (có thể thêm độ trễ); memory / sqlite dùng
+thẳng modules/storage.
+
+    python bench_firebase.py pokemon_data.json --latency 80 --jitter 40
+    python bench_firebase.py pokemon_data.json --mode patch --lookups 200
+    python bench_firebase.py pokemon_data.json --backend memory
+"""
+import argparse
+import asyncio
+import os
+import random
+import tempfile
+import time
+
+import upload_firebase
+from firebase_emulator import EmulatorThread
+from modules.pokemon_modules.firebase_request import PokemonService
+from modules.storage import STORAGE_BACKENDS, MemoryStorage
+from modules.storage.firebase import FirebaseStorage
+from modules.storage.sqlite import SQLiteStorage
+
+def timed(label: str, start: float, count: int, unit: str) -> None:
+    elapsed = max(time.perf_counter() - start, 1e-9)
+    print(f"  {label:<18} {elapsed * 1000:>9.1f} ms  {count / elapsed:>10,.0f} {unit}/s")
+
+async def bench_bot(make_storage, lookups: int, seed: int) -> None:
+    service = PokemonService(storage=make_storage(), snapshot_file=None)
+    try:
+        start = time.perf_counter()
+        await service.build_cache()
+        timed("build_cache", start, 1, "builds")
+
+        buckets = [(gen, fmt, rating) for gen in service.get_gens_cached()
+                   for fmt in service.get_formats_cached(gen)
+                   for rating in service.get_ratings_cached(gen, fmt) + ["all"]]
+        rnd = random.Random(seed)
+        queries = []
+        for _ in range(lookups):
+            gen, fmt, rating = rnd.choice(buckets)
+            names = service.get_pokemons_cached(gen, fmt, rating)
+            if names: queries.append((gen, fmt, rating, rnd.choice(names[:50])))
+
+        for label in ("lookup (cold)", "lookup (cached)"):
+            start = time.perf_counter()
+            await asyncio.gather(*(service.get_pokemon_data_async(*q) for q in queries))
+            timed(label, start, len(queries), "lookups")
+
+        searches = [(gen, fmt, rating, name[:n]) for gen, fmt, rating, name in queries for n in (1, 3)]
+        for q in searches: service.search_pokemons(*q)  # dựng SearchIndex trước, chỉ đo truy vấn
+        start = time.perf_counter()
+        for q in searches: service.search_pokemons(*q)
+        timed("autocomplete", start, len(searches), "queries")
+    finally:
+        await service.storage.close()
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark upload + bot trên Firebase giả lập / storage cục bộ.")
+    parser.add_argument("file", help="Output JSON / NDJSON của smogon_fetch")
+    parser.add_argument("--backend", choices=STORAGE_BACKENDS, default="firebase")
+    parser.add_argument("--latency", type=float, default=0.0, help="Độ trễ mỗi request của emulator (ms)")
+    parser.add_argument("--jitter", type=float, default=0.0, help="Độ trễ ngẫu nhiên thêm tối đa (ms)")
+    parser.add_argument("--mode", choices=upload_firebase.UPLOAD_MODES, default="put")
+    parser.add_argument("--concurrency", type=int, default=upload_firebase.CONCURRENCY)
+    parser.add_argument("--lookups", type=int, default=100)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    server = None
+    tmp_dir = tempfile.TemporaryDirectory()
+    if args.backend == "firebase":
+        server = EmulatorThread(latency=args.latency / 1000, jitter=args.jitter / 1000)
+        url = server.start()
+        upload_firebase.FIREBASE_URL = url
+        make_storage = lambda: FirebaseStorage(url)
+        print(f"Emulator {url} (latency {args.latency:.0f}+{args.jitter:.0f} ms)")
+    elif args.backend == "sqlite":
+        db_file = os.path.join(tmp_dir.name, "bench.sqlite3")
+        upload_firebase.local_storage = SQLiteStorage(db_file)
+        make_storage = lambda: SQLiteStorage(db_file)
+    else:
+        memory = upload_firebase.local_storage = MemoryStorage()
+        make_storage = lambda: memory
+
+    try:
+        start = time.perf_counter()
+        items = upload_firebase.with_all_ratings(upload_firebase.iter_format_ratings(args.file))
+        upload_firebase.upload_all(items, args.concurrency, args.mode)
+        upload_elapsed = time.perf_counter() - start
+        print(upload_firebase.stats.summary())
+
+        print(f"\nRESULTS ({args.backend}, {args.mode}, concurrency {args.concurrency})")
+        print(f"  {'upload':<18} {upload_elapsed * 1000:>9.1f} ms")
+        asyncio.run(bench_bot(make_storage, args.lookups, args.seed))
+        if server: print(f"  emulator requests  {server.emulator.requests}")
+    finally:
+        if server: server.stop()
+        if isinstance(upload_firebase.local_storage, SQLiteStorage): upload_firebase.local_storage.close_sync()
+        tmp_dir.cleanup()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,180 @@
+"""
+Benchmark parser moveset: so sánh bản cũ (normalize_lines + find_headers + parse_block
+dùng re.match inline) với MovesetParser một lượt trong smogon_fetch.
+
+    python bench_parser.py gen9ou-1825.txt gen9ubers-0.txt
+    python bench_parser.py --download 5        # tải 5 file mẫu của MONTH về SAMPLE_DIR
+"""
+import argparse
+import os
+import re
+import time
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from urllib.parse import urljoin
+
+import smogon_fetch
+
+SAMPLE_DIR = "bench_samples"
+
+# --- BẢN CŨ (giữ nguyên để đối chiếu output và tốc độ) ---
+def legacy_normalize_lines(text: str) -> List[str]:
+    lines = text.splitlines()
+    out = []
+    for i, ln in enumerate(lines):
+        if i == 0: ln = ln.lstrip("\ufeff")
+        ln = ln.strip()
+        if ln: out.append(ln)
+    return out
+
+def legacy_is_border(line: str) -> bool:
+    return bool(re.match(r"^\+\-+\+$", line.strip()))
+
+def legacy_find_headers(lines: List[str]) -> List[Tuple[int, str]]:
+    headers = []
+    for i in range(len(lines) - 2):
+        if (legacy_is_border(lines[i]) and
+            lines[i+1].startswith("|") and lines[i+1].endswith("|") and
+            legacy_is_border(lines[i+2])):
+            name = smogon_fetch.clean_cell(lines[i+1])
+            if name and name not in smogon_fetch.SECTION_NAMES and ":" not in name:
+                headers.append((i, name))
+    return headers
+
+def legacy_parse_block(blines: List[str]) -> Dict[str, Any]:
+    out: Dict[str, Any] = {
+        "raw_count": None,
+        "avg_weight": None,
+        "viability_ceiling": None,
+        "sections": {},
+    }
+
+    current_section: Optional[str] = None
+    i = 0
+    while i < len(blines):
+        line = blines[i]
+        if line.startswith("|") and line.endswith("|"):
+            cell = smogon_fetch.clean_cell(line)
+
+            if cell in smogon_fetch.SECTION_NAMES:
+                current_section = cell
+                out["sections"].setdefault(current_section, [])
+                i += 1
+                continue
+
+            meta_match = re.match(r"^(Raw count|Avg\. weight|Viability Ceiling):\s*(.+)$", cell)
+            if meta_match:
+                k, v = meta_match.group(1), meta_match.group(2).strip()
+                if k == "Raw count": out["raw_count"] = int(v.replace(",", ""))
+                elif k == "Avg. weight": out["avg_weight"] = float(v)
+                elif k == "Viability Ceiling": out["viability_ceiling"] = int(v)
+                i += 1
+                continue
+
+            if current_section and cell:
+                if current_section == "Checks and Counters":
+                    opp_match = re.match(r"^(.+?)\s+(\d+\.\d+)\s+\(", cell)
+                    entry = {"opponent": None, "raw": cell, "detail": None}
+                    if opp_match:
+                        entry["opponent"] = opp_match.group(1).strip()
+
+                    if i + 1 < len(blines):
+                        nxt_line = blines[i+1]
+                        if nxt_line.startswith("|") and nxt_line.endswith("|"):
+                            nxt_cell = smogon_fetch.clean_cell(nxt_line)
+                            if nxt_cell.startswith("("):
+                                entry["detail"] = nxt_cell
+                                i += 1
+                    out["sections"][current_section].append(entry)
+                else:
+                    pct_match = re.match(r"^(.*?)(\s+)([\d.]+%)$", cell)
+                    if pct_match:
+                        out["sections"][current_section].append({
+                            "name": pct_match.group(1).strip(),
+                            "pct": float(pct_match.group(3)[:-1])
+                        })
+                    else:
+                        out["sections"][current_section].append({"raw": cell})
+        i += 1
+
+    out["sections"] = {k: v for k, v in out["sections"].items() if v}
+    return out
+
+def legacy_parse_smogon_text(text: str) -> Dict[str, Dict[str, Any]]:
+    lines = legacy_normalize_lines(text)
+    headers = legacy_find_headers(lines)
+    pokemon_dict = {}
+    for idx, (start, name) in enumerate(headers):
+        end = headers[idx + 1][0] if idx + 1 < len(headers) else len(lines)
+        pokemon_dict[name] = legacy_parse_block(lines[start:end])
+    return pokemon_dict
+
+# --- BENCHMARK ---
+def download_samples(count: int) -> List[str]:
+    os.makedirs(SAMPLE_DIR, exist_ok=True)
+    paths = []
+    for fname in smogon_fetch.list_txt_files(smogon_fetch.INDEX_URL)[:count]:
+        # Lưu bản đã giải nén (.txt) dù index trả về .txt.gz
+        path = os.path.join(SAMPLE_DIR, fname[:-3] if fname.endswith(".gz") else fname)
+        if not os.path.exists(path):
+            data, _, _ = smogon_fetch.fetch_bytes(urljoin(smogon_fetch.INDEX_URL, fname))
+            if data is None: continue
+            with open(path, "wb") as f:
+                f.write(data)
+        paths.append(path)
+    return paths
+
+def best_time(fn: Callable[[str], Any], text: str, repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn(text)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark parser Smogon moveset.")
+    parser.add_argument("files", nargs="*", help="Các file moveset .txt")
+    parser.add_argument("--download", type=int, default=0,
+                        help=f"Tải N file mẫu từ {smogon_fetch.INDEX_URL} vào {SAMPLE_DIR}/")
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    paths = list(args.files)
+    if args.download:
+        paths += download_samples(args.download)
+    if not paths:
+        parser.error("Cần ít nhất một file (hoặc --download N).")
+
+    impls = [
+        ("legacy", legacy_parse_smogon_text),
+        ("state-machine", smogon_fetch.parse_smogon_text),
+    ]
+    totals = {name: 0.0 for name, _ in impls}
+    total_lines = 0
+    total_mb = 0.0
+
+    for path in paths:
+        with open(path, "r", encoding="utf-8", newline="") as f:
+            text = f.read()
+        n_lines = len(text.splitlines())
+        mb = len(text.encode("utf-8")) / (1024 * 1024)
+        total_lines += n_lines
+        total_mb += mb
+
+        if smogon_fetch.parse_smogon_text(text) != legacy_parse_smogon_text(text):
+            print(f"[ERR] Output khác nhau: {path}")
+
+        print(f"{os.path.basename(path)} ({n_lines} lines, {mb:.2f} MB)")
+        for name, fn in impls:
+            t = best_time(fn, text, args.repeat)
+            totals[name] += t
+            print(f"  {name:<14} {n_lines / t:>12,.0f} lines/s {mb / t:>8.2f} MB/s")
+
+    print(f"\nTOTAL ({len(paths)} files, {total_lines} lines, {total_mb:.2f} MB)")
+    for name, _ in impls:
+        t = totals[name]
+        print(f"  {name:<14} {total_lines / t:>12,.0f} lines/s {total_mb / t:>8.2f} MB/s")
+    print(f"  speedup        {totals['legacy'] / totals['state-machine']:.2f}x")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,202 @@
+"""
+Firebase Realtime Database giả lập (REST + streaming) để chạy bot / upload_firebase cục bộ,
+test và benchmark offline.
+
+    python firebase_emulator.py --port 9000 --data snapshot.json --latency 80 --jitter 40
+    FIREBASE_URL=http://127.0.0.1:9000 python main.py
+    FIREBASE_URL=http://127.0.0.1:9000 python upload_firebase.py pokemon_data.json
+
+Hỗ trợ phần REST mà bot dùng: GET / PUT / PATCH / DELETE trên /{path}.json, shallow=true,
+PATCH nhiều path ({"a/b": 1, "c": 2}), ETag (X-Firebase-ETag / if-match) và GET với
+"Accept: text/event-stream" (event put / patch / keep-alive như Firebase thật).
+Trong script sync có thể chạy ngay trong process: `with EmulatorThread(data) as url: ...`
+"""
+import argparse
+import asyncio
+import hashlib
+import json
+import random
+import threading
+from aiohttp import web
+from modules.storage import FirebaseMirror, shallow_value, split_path
+
+KEEPALIVE_EVERY = 30  # giây, giống Firebase
+JSON_ERROR = {"error": "Invalid data; couldn't parse JSON object, array, or value."}
+
+def etag(value) -> str:
+    return hashlib.sha1(json.dumps(value, ensure_ascii=False, separators=(",", ":")).encode("utf-8")).hexdigest()
+
+class Emulator:
+    def __init__(self, data=None, latency: float = 0.0, jitter: float = 0.0):
+        self.db = FirebaseMirror()
+        self.db.data = data
+        self.latency = latency  # giây thêm vào mỗi request
+        self.jitter = jitter    # + ngẫu nhiên [0, jitter) giây
+        self.listeners = []     # [(path parts, asyncio.Queue)]
+        self.requests = 0
+
+    @web.middleware
+    async def inject_latency(self, request: web.Request, handler):
+        self.requests += 1
+        delay = self.latency + (random.uniform(0, self.jitter) if self.jitter else 0)
+        if delay: await asyncio.sleep(delay)
+        return await handler(request)
+
+    def notify(self, event: str, parts: list, data) -> None:
+        """Gửi event cho mọi stream có path nằm trên hoặc dưới path vừa ghi."""
+        for sub, queue in self.listeners:
+            if parts[:len(sub)] == sub:
+                queue.put_nowait((event, "/" + "/".join(parts[len(sub):]), data))
+            elif sub[:len(parts)] == parts:
+                # Ghi vào node cha: gửi lại toàn bộ node đang nghe
+                queue.put_nowait(("put", "/", self.db.get(*sub)))
+
+    def reply(self, request: web.Request, value, status: int = 200) -> web.Response:
+        headers = {}
+        if request.headers.get("X-Firebase-ETag", "").lower() == "true":
+            headers["ETag"] = etag(value)
+        if request.query.get("print") == "silent" and status == 200:
+            return web.Response(status=204, headers=headers)
+        return web.json_response(value, status=status, headers=headers, dumps=lambda v: json.dumps(v, ensure_ascii=False))
+
+    async def handle(self, request: web.Request) -> web.StreamResponse:
+        path = request.match_info["path"]
+        if not path.endswith(".json"):
+            return web.json_response({"error": "Path must end with .json"}, status=400)
+        parts = split_path(path[:-len(".json")])
+
+        if request.method == "GET":
+            if "text/event-stream" in request.headers.get("Accept", ""):
+                return await self.stream(request, parts)
+            value = self.db.get(*parts)
+            if request.query.get("shallow") == "true": value = shallow_value(value)
+            return self.reply(request, value)
+
+        if request.method not in ("PUT", "PATCH", "DELETE"):
+            return web.json_response({"error": "Method not allowed"}, status=405)
+
+        # Ghi có điều kiện: if-match phải khớp ETag hiện tại, không thì 412 kèm giá trị + ETag mới
+        if_match = request.headers.get("if-match")
+        if if_match is not None and request.method != "PATCH":
+            current = self.db.get(*parts)
+            if if_match != etag(current):
+                return web.json_response(current, status=412, headers={"ETag": etag(current)})
+
+        if request.method == "DELETE":
+            self.db.set_path(parts, None)
+            self.notify("put", parts, None)
+            return self.reply(request, None)
+
+        try:
+            body = json.loads(await request.read())
+        except ValueError:
+            return web.json_response(JSON_ERROR, status=400)
+
+        if request.method == "PUT":
+            self.db.set_path(parts, body)
+            self.notify("put", parts, body)
+        else:
+            if not isinstance(body, dict):
+                return web.json_response(JSON_ERROR, status=400)
+            # Multi-path: key có thể là "a/b/c"; không được có path này là cha của path khác
+            keys = sorted(tuple(split_path(k)) for k in body)
+            if any(b[:len(a)] == a for a, b in zip(keys, keys[1:])):
+                return web.json_response({"error": "Invalid data; paths overlap in multi-path update."}, status=400)
+            self.db.apply("patch", "/".join(parts), body)
+            self.notify("patch", parts, body)
+        return self.reply(request, body)
+
+    async def stream(self, request: web.Request, parts: list) -> web.StreamResponse:
+        resp = web.StreamResponse(headers={"Content-Type": "text/event-stream", "Cache-Control": "no-cache"})
+        await resp.prepare(request)
+        queue = asyncio.Queue()
+        queue.put_nowait(("put", "/", self.db.get(*parts)))
+        listener = (parts, queue)
+        self.listeners.append(listener)
+        try:
+            while True:
+                try:
+                    event, path, data = await asyncio.wait_for(queue.get(), KEEPALIVE_EVERY)
+                    payload = json.dumps({"path": path, "data": data}, ensure_ascii=False)
+                except asyncio.TimeoutError:
+                    event, payload = "keep-alive", "null"
+                await resp.write(f"event: {event}\ndata: {payload}\n\n".encode("utf-8"))
+        except (ConnectionResetError, asyncio.CancelledError):
+            pass
+        finally:
+            self.listeners.remove(listener)
+        return resp
+
+def make_app(data=None, latency: float = 0.0, jitter: float = 0.0) -> web.Application:
+    emulator = Emulator(data, latency, jitter)
+    app = web.Application(client_max_size=256 * 1024 * 1024, middlewares=[emulator.inject_latency])
+    app["emulator"] = emulator
+    app.router.add_route("*", "/{path:.*}", emulator.handle)
+    return app
+
+class EmulatorThread:
+    """
+    Chạy emulator trên event loop riêng trong một thread, cho script sync và benchmark:
+
+        with EmulatorThread(data, latency=0.05) as url:
+            upload_firebase.FIREBASE_URL = url
+    """
+
+    def __init__(self, data=None, host: str = "127.0.0.1", port: int = 0, latency: float = 0.0, jitter: float = 0.0):
+        self.app = make_app(data, latency, jitter)
+        self.emulator = self.app["emulator"]
+        self.host = host
+        self.port = port
+        self.url = None
+        self.loop = None
+        self.thread = None
+        self.ready = threading.Event()
+
+    def _run(self):
+        self.loop = asyncio.new_event_loop()
+        runner = web.AppRunner(self.app, shutdown_timeout=1.0)
+        self.loop.run_until_complete(runner.setup())
+        self.loop.run_until_complete(web.TCPSite(runner, self.host, self.port).start())
+        self.port = runner.addresses[0][1]
+        self.url = f"http://{self.host}:{self.port}"
+        self.ready.set()
+        self.loop.run_forever()
+        self.loop.run_until_complete(runner.cleanup())
+        self.loop.close()
+
+    def start(self) -> str:
+        self.thread = threading.Thread(target=self._run, name="firebase-emulator", daemon=True)
+        self.thread.start()
+        self.ready.wait()
+        return self.url
+
+    def stop(self) -> None:
+        if self.loop and self.thread.is_alive():
+            self.loop.call_soon_threadsafe(self.loop.stop)
+            self.thread.join()
+
+    def __enter__(self) -> str:
+        return self.start()
+
+    def __exit__(self, *exc) -> None:
+        self.stop()
+
+def main():
+    parser = argparse.ArgumentParser(description="Firebase Realtime Database giả lập cho test / benchmark cục bộ.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=9000)
+    parser.add_argument("--data", help="File JSON làm dữ liệu ban đầu (vd. export từ Firebase)")
+    parser.add_argument("--latency", type=float, default=0.0, help="Độ trễ thêm vào mỗi request (ms)")
+    parser.add_argument("--jitter", type=float, default=0.0, help="Độ trễ ngẫu nhiên thêm tối đa (ms)")
+    args = parser.parse_args()
+
+    data = None
+    if args.data:
+        with open(args.data, "r", encoding="utf-8") as f:
+            data = json.load(f)
+    print(f"Firebase emulator: http://{args.host}:{args.port} (latency {args.latency:.0f}+{args.jitter:.0f} ms)")
+    print(f"Chạy bot / script với FIREBASE_URL=http://{args.host}:{args.port}")
+    web.run_app(make_app(data, args.latency / 1000, args.jitter / 1000), host=args.host, port=args.port, print=None)
+
+if __name__ == "__main__":
+    main()
@@ -3,21 +3,25 @@ from typing import Dict, Optional
 
 import disnake
 from disnake.ext import commands
-import requests
+from modules.storage import Storage, get_storage, join_path
 
-# ====== CẤU HÌNH FIREBASE (REST) ======
-FIREBASE_URL = "https://vo-robin-default-rtdb.asia-southeast1.firebasedatabase.app"
-TIMEOUT = 10  # seconds cho mỗi request
-
-def _url(path: str) -> str:
-    # đảm bảo không có // dư
-    return f"{FIREBASE_URL.rstrip('/')}/{path.lstrip('/')}.json"
+# ====== CẤU HÌNH STORAGE ======
+# Node ladderboard/{guild_id}/{user_id} = điểm (Firebase / SQLite / memory, xem modules/storage)
+LADDER_PATH = "ladderboard"
 
 
 class Ladderboard(commands.Cog):
-    def __init__(self, bot: commands.Bot):
+    def __init__(self, bot: commands.Bot, storage: Storage):
         self.bot = bot
         self._lock = asyncio.Lock()
+        self.storage = storage
+        self.view = None
+
+    @commands.Cog.listener()
+    async def on_ready(self):
+        # Firebase: giữ bản sao /ladderboard qua REST streaming, đọc bảng điểm không cần GET
+        if self.view is None:
+            self.view = self.storage.watch(LADDER_PATH)
 
     def _safe_int(self, x, default=0):
         try:
@@ -25,50 +29,22 @@ class Ladderboard(commands.Cog):
         except Exception:
             return default
 
-    # ------------------ synchronous helpers using requests ------------------
-    def _get_bucket_sync(self, guild_id: int) -> Dict[str, int]:
-        """GET /ladderboard/{guild_id}.json"""
-        try:
-            url = _url(f"ladderboard/{guild_id}")
-            r = requests.get(url, timeout=TIMEOUT)
-            r.raise_for_status()
-            data = r.json()
-            if isinstance(data, dict):
-                return data
-            return {}
-        except requests.RequestException:
-            # network / firebase error -> trả về rỗng (caller có thể xử lý)
-            return {}
-
-    def _set_user_score_sync(self, guild_id: int, user_id: int, points: int) -> bool:
-        """PUT /ladderboard/{guild_id}/{user_id}.json"""
-        try:
-            url = _url(f"ladderboard/{guild_id}/{user_id}")
-            r = requests.put(url, json=points, timeout=TIMEOUT)
-            r.raise_for_status()
-            return True
-        except requests.RequestException:
-            return False
-
-    def _delete_user_sync(self, guild_id: int, user_id: int) -> bool:
-        """DELETE /ladderboard/{guild_id}/{user_id}.json"""
-        try:
-            url = _url(f"ladderboard/{guild_id}/{user_id}")
-            r = requests.delete(url, timeout=TIMEOUT)
-            r.raise_for_status()
-            return True
-        except requests.RequestException:
-            return False
-
-    # ------------------ async wrappers (to avoid blocking event loop) ------------------
+    # ------------------ storage helpers ------------------
     async def _get_bucket(self, guild_id: int) -> Dict[str, int]:
-        return await asyncio.to_thread(self._get_bucket_sync, guild_id)
+        """GET /ladderboard/{guild_id}"""
+        data = await self.storage.get(join_path(LADDER_PATH, guild_id))
+        if isinstance(data, dict):
+            return data
+        # không có dữ liệu / lỗi storage -> trả về rỗng (caller có thể xử lý)
+        return {}
 
     async def _set_user_score(self, guild_id: int, user_id: int, points: int) -> bool:
-        return await asyncio.to_thread(self._set_user_score_sync, guild_id, user_id, points)
+        """PUT /ladderboard/{guild_id}/{user_id}"""
+        return await self.storage.put(join_path(LADDER_PATH, guild_id, user_id), points)
 
     async def _delete_user(self, guild_id: int, user_id: int) -> bool:
-        return await asyncio.to_thread(self._delete_user_sync, guild_id, user_id)
+        """DELETE /ladderboard/{guild_id}/{user_id}"""
+        return await self.storage.delete(join_path(LADDER_PATH, guild_id, user_id))
 
     # ================= COMMANDS =================
 
@@ -236,4 +212,4 @@ class Ladderboard(commands.Cog):
 
 
 def setup(bot: commands.Bot):
-    bot.add_cog(Ladderboard(bot))
+    bot.add_cog(Ladderboard(bot, get_storage()))
@@ -3,10 +3,11 @@ from disnake.ext import commands
 import requests
 import json
 from unidecode import unidecode
+from modules.storage import Storage, get_storage, join_path
 
-# --- CẤU HÌNH FIREBASE URL ---
-# Lưu ý: Với Firebase REST API, luôn phải thêm đuôi ".json" vào cuối đường dẫn
-BASE_DB_URL = "https://vo-robin-default-rtdb.asia-southeast1.firebasedatabase.app/pokemondata/noi-tu"
+# --- CẤU HÌNH STORAGE ---
+# Node chứa dữ liệu game trong storage (Firebase / SQLite / memory, xem modules/storage)
+NOI_TU_PATH = "pokemondata/noi-tu"
 
 # def check_dictionary(word):
 #     """Kiểm tra từ có tồn tại qua Free Dictionary API"""
@@ -48,30 +49,31 @@ def check_cambridge_dictionary(word):
 
 
 class NoiTu(commands.Cog):
-    def __init__(self, bot: commands.Bot):
+    def __init__(self, bot: commands.Bot, storage: Storage):
         self.bot = bot
+        self.storage = storage
+        self.view = None
 
-    # --- HÀM HỖ TRỢ GỌI FIREBASE (REST) ---
-    def get_server_data(self, guild_id):
-        url = f"{BASE_DB_URL}/{guild_id}.json"
-        resp = requests.get(url)
-        if resp.status_code == 200 and resp.json() is not None:
-            return resp.json()
-        return None
+    @commands.Cog.listener()
+    async def on_ready(self):
+        # Firebase: giữ bản sao noi-tu qua REST streaming -> on_message không phải GET
+        if self.view is None:
+            self.view = self.storage.watch(NOI_TU_PATH)
+
+    # --- HÀM HỖ TRỢ GỌI STORAGE ---
+    async def get_server_data(self, guild_id):
+        return await self.storage.get(join_path(NOI_TU_PATH, guild_id)) or None
 
-    def update_server_data(self, guild_id, data):
+    async def update_server_data(self, guild_id, data):
         """Dùng PATCH để cập nhật các trường cụ thể mà không ghi đè toàn bộ"""
-        url = f"{BASE_DB_URL}/{guild_id}.json"
-        requests.patch(url, json=data)
+        await self.storage.patch(join_path(NOI_TU_PATH, guild_id), data)
 
-    def set_server_data(self, guild_id, data):
+    async def set_server_data(self, guild_id, data):
         """Dùng PUT để ghi đè hoặc tạo mới hoàn toàn"""
-        url = f"{BASE_DB_URL}/{guild_id}.json"
-        requests.put(url, json=data)
+        await self.storage.put(join_path(NOI_TU_PATH, guild_id), data)
 
-    def delete_server_data(self, guild_id):
-        url = f"{BASE_DB_URL}/{guild_id}.json"
-        requests.delete(url)
+    async def delete_server_data(self, guild_id):
+        await self.storage.delete(join_path(NOI_TU_PATH, guild_id))
 
     # --- COMMANDS ---
 
@@ -80,7 +82,7 @@ class NoiTu(commands.Cog):
     async def noitu_start(self, inter: disnake.ApplicationCommandInteraction):
         guild_id = str(inter.guild_id)
         channel_id = str(inter.channel_id)
-        data = self.get_server_data(guild_id)
+        data = await self.get_server_data(guild_id)
         if data:
             await inter.response.send_message("Game đã bắt đầu trước đó rồi! Hãy reset nếu muốn bắt đầu lại.", ephemeral=True)
             return
@@ -93,7 +95,7 @@ class NoiTu(commands.Cog):
         }
 
         # Gửi request PUT lên Firebase để tạo mới
-        self.set_server_data(guild_id, game_data)
+        await self.set_server_data(guild_id, game_data)
         
         await inter.response.send_message(
             f"Nối từ đã bắt đầu bởi <@{inter.author.id}>! Hãy gõ một từ bất kỳ <:9557kannalove:1072407455365091338>", 
@@ -106,7 +108,7 @@ class NoiTu(commands.Cog):
         guild_id = str(inter.guild_id)
         
         # Gửi request DELETE lên Firebase
-        self.delete_server_data(guild_id)
+        await self.delete_server_data(guild_id)
         
         await inter.response.send_message("🧹 Đã làm sạch dữ liệu game nối từ.")
 
@@ -118,7 +120,7 @@ class NoiTu(commands.Cog):
         guild_id = str(message.guild.id)
         
         # 1. Lấy dữ liệu từ Firebase về để check
-        data = self.get_server_data(guild_id)
+        data = await self.get_server_data(guild_id)
 
         # Nếu không có dữ liệu (chưa start) hoặc sai kênh -> Bỏ qua
         if not data:
@@ -172,10 +174,10 @@ class NoiTu(commands.Cog):
         # 2. Thêm từ vào history (dùng PATCH để thêm key mới vào dict history mà không ghi đè cái cũ)
         
         # URL update history: .../noi-tu/{guild_id}/history.json
-        requests.patch(f"{BASE_DB_URL}/{guild_id}/history.json", json={current_word: 1})
+        await self.storage.patch(join_path(NOI_TU_PATH, guild_id, "history"), {current_word: 1})
         
         # Update state game
-        self.update_server_data(guild_id, {
+        await self.update_server_data(guild_id, {
             "last_player_id": player_id,
             "last_word": current_word
         })
@@ -183,4 +185,4 @@ class NoiTu(commands.Cog):
         await message.add_reaction("✅")
 
 def setup(bot: commands.Bot):
-    bot.add_cog(NoiTu(bot))
+    bot.add_cog(NoiTu(bot, get_storage()))
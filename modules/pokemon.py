@@ -97,9 +97,11 @@ class PokemonCog(commands.Cog):
 
     @commands.Cog.listener()
     async def on_ready(self):
-        if not firebase_service.is_ready:
+        # Snapshot đã được load khi import (autocomplete dùng được ngay), ở đây chỉ làm mới ở nền
+        if firebase_service.refresh_task is None:
             print("⏳ Starting background task...")
-            self.bot.loop.create_task(firebase_service.build_cache())
+            firebase_service.start_background_refresh()
+            firebase_service.start_usage_stream()
 
     @commands.slash_command(name="pokemon_search", description="Search Pokemon stats from Smogon database")
     async def pokemon_search(self, inter: disnake.ApplicationCommandInteraction, gen: str, format: str, rating: str, pokemon: str):
@@ -152,8 +154,7 @@ class PokemonCog(commands.Cog):
     async def format_autocomp(self, inter, user_input):
         gen = inter.filled_options.get("gen")
         if not gen: return []
-        options = firebase_service.get_formats_cached(gen)
-        return [f for f in options if user_input.lower() in f.lower()][:25]
+        return firebase_service.search_formats(gen, user_input)
     @pokemon_search.autocomplete("rating")
     async def rating_autocomp(self, inter, user_input):
         gen = inter.filled_options.get("gen")
@@ -168,8 +169,7 @@ class PokemonCog(commands.Cog):
         fmt = inter.filled_options.get("format")
         rating = inter.filled_options.get("rating")
         if not all([gen, fmt, rating]): return []
-        pokemons = firebase_service.get_pokemons_cached(gen, fmt, rating)
-        return [p for p in pokemons if user_input.lower() in p.lower()][:25]
+        return firebase_service.search_pokemons(gen, fmt, rating, user_input)
 
 def setup(bot):
     bot.add_cog(PokemonCog(bot))
\ No newline at end of file
@@ -2,6 +2,8 @@ import re
 import disnake
 from typing import Any, Dict, List, Optional, Tuple
 
+from modules.pokemon_modules import aggregate
+
 STAT_SECTIONS = ["Moves", "Abilities", "Items", "Spreads", "Tera Types"]
 TEAM_SECTION = "Teammates"
 CHECK_SECTION = "Checks and Counters"
@@ -76,7 +78,7 @@ def _merge_average_across_ratings(
                 out["sections"][sec] = first_with["sections"][sec]
             continue
 
-        merged: Dict[str, float] = {}
+        rows: List[Dict[str, float]] = []
         for p in per_rating:
             entries = []
             if p and isinstance(p.get("sections"), dict):
@@ -86,18 +88,11 @@ def _merge_average_across_ratings(
             for e in entries:
                 if "name" in e and "pct" in e:
                     local[str(e["name"])] = float(e["pct"])
+            rows.append(local)
 
-            for nm in local.keys():
-                if nm not in merged:
-                    merged[nm] = 0.0
-
-            for nm in merged.keys():
-                merged[nm] += local.get(nm, 0.0)
-
-        n = float(len(ratings))
-        out_list = [{"name": nm, "pct": merged[nm] / n} for nm in merged.keys()]
-        out_list.sort(key=lambda d: d["pct"], reverse=True)
-        out["sections"][sec] = out_list
+        # Trung bình không trọng số: rating thiếu Pokemon / entry tính là 0
+        merged = aggregate.weighted_sums((local.items() for local in rows), [1] * len(rows))
+        out["sections"][sec] = aggregate.ranked_entries(merged, float(len(ratings)))
 
     return out
 
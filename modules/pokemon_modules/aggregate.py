@@ -0,0 +1,117 @@
+"""
+Tính trung bình có trọng số (theo raw_count) của một Pokemon qua nhiều rating.
+Không import aiohttp / disnake để dùng chung cho bot (PokemonService, rating "all",
+pokemon_embed) và script upload (tính sẵn rating "all" lúc ingest).
+
+Tổng có trọng số được cộng tuần tự theo thứ tự rating nên kết quả giống hệt nhau
+đến từng bit dù tính ở đâu (lúc upload hay lúc tra cứu).
+"""
+import re
+from operator import itemgetter
+
+ALL_RATING = "all"
+AVG_SECTIONS = ("Moves", "Abilities", "Items", "Spreads", "Tera Types", "Teammates")
+COUNTERS_SECTION = "Checks and Counters"
+SCORE_RE = re.compile(r"(\d+(?:\.\d+)?)")
+_PCT = itemgetter("pct")
+
+def sort_ratings(ratings) -> list:
+    """Rating theo thứ tự số (bỏ rating tổng hợp "all"); rating không phải số thì giữ nguyên thứ tự."""
+    ratings = [r for r in ratings if r != ALL_RATING]
+    try: ratings.sort(key=int)
+    except ValueError: pass
+    return ratings
+
+def usage_order(rating: str, pokemons: dict) -> list:
+    """
+    Tên Pokemon theo usage giảm dần. Rating thật giữ nguyên thứ tự của smogon_fetch (đã theo usage);
+    rating "all" tính sẵn thì xếp theo tổng raw_count.
+    """
+    if rating != ALL_RATING: return list(pokemons)
+    return sorted(pokemons, key=lambda name: (pokemons[name] or {}).get("raw_count") or 0, reverse=True)
+
+def counter_score(c: dict, opp: str) -> float:
+    raw = c.get("raw", "")
+    # Bỏ tên đối thủ ở đầu để số trong tên (Mr. Mime, Dragapult-...) không bị lấy nhầm
+    if raw.startswith(opp): raw = raw[len(opp):]
+    match = SCORE_RE.search(raw)
+    return float(match.group(1)) if match else 0
+
+def weighted_sums(rows, weights) -> dict:
+    """
+    rows[i]: các cặp (tên, giá trị) của rating thứ i, weights[i]: trọng số của rating đó.
+    Trả {tên: tổng có trọng số} theo thứ tự xuất hiện đầu tiên; cộng tuần tự theo thứ tự rating.
+    """
+    sums = {}
+    get = sums.get
+    for row, weight in zip(rows, weights):
+        for name, value in row:
+            sums[name] = get(name, 0.0) + value * weight
+    return sums
+
+def ranked_entries(sums: dict, divisor, key: str = "name") -> list:
+    """[{key: tên, "pct": tổng / divisor}] giảm dần theo pct, bằng nhau giữ thứ tự cũ."""
+    entries = [{key: name, "pct": val / divisor} for name, val in sums.items()]
+    entries.sort(key=_PCT, reverse=True)
+    return entries
+
+def weighted_average(pokemon: str, ratings: list, results: list) -> dict:
+    """
+    `results`: record của Pokemon ở từng rating (theo thứ tự `ratings`, bỏ rating không có).
+    Thứ tự cộng dồn cố định nên kết quả giống hệt nhau dù tính ở đâu.
+    """
+    total_raw_count = sum(d.get("raw_count", 0) for d in results)
+    if total_raw_count == 0: total_raw_count = 1
+    weights = [d.get("raw_count", 0) for d in results]
+    all_sections = [d.get("sections", {}) for d in results]
+
+    final_sections = {}
+    for sec_name in AVG_SECTIONS:
+        rows = [[(item.get("name"), item.get("pct", 0)) for item in sections.get(sec_name, []) if item.get("name")]
+                for sections in all_sections]
+        final_sections[sec_name] = ranked_entries(weighted_sums(rows, weights), total_raw_count)
+
+    counter_rows = []
+    counter_detail = {}  # opp -> [detail, max_weight]
+    for sections, weight in zip(all_sections, weights):
+        row = []
+        for c in sections.get(COUNTERS_SECTION, []):
+            opp = c.get("opponent") or c.get("name")
+            if not opp: continue
+            row.append((opp, counter_score(c, opp)))
+            # detail lấy từ rating có trọng số lớn nhất (bằng nhau thì giữ rating đầu tiên)
+            detail = counter_detail.get(opp)
+            if detail is None:
+                detail = counter_detail[opp] = [c.get("detail", ""), 0]
+            if weight > detail[1]:
+                detail[0] = c.get("detail", "")
+                detail[1] = weight
+        counter_rows.append(row)
+
+    final_counters = ranked_entries(weighted_sums(counter_rows, weights), total_raw_count, key="opponent")
+    for e in final_counters:
+        e["detail"] = counter_detail[e["opponent"]][0]
+    final_sections[COUNTERS_SECTION] = final_counters
+
+    return {
+        "name": pokemon,
+        "raw_count": total_raw_count,
+        "info": f"Weighted average from {len(results)} ratings ({', '.join(ratings)})",
+        "sections": final_sections
+    }
+
+def aggregate_format(ratings_data: dict) -> dict:
+    """
+    {rating: {pokemon: record}} của một format -> {pokemon: bản trung bình} cho rating "all",
+    giống hệt kết quả PokemonService tính lúc tra cứu.
+    """
+    ratings = sort_ratings(ratings_data.keys())
+    names = {}
+    for r in ratings:
+        names.update(dict.fromkeys(ratings_data[r]))
+
+    out = {}
+    for pokemon in names:
+        results = [ratings_data[r][pokemon] for r in ratings if ratings_data[r].get(pokemon)]
+        out[pokemon] = weighted_average(pokemon, ratings, results)
+    return out
@@ -0,0 +1,112 @@
+"""
+Bảng alias tên Smogon -> ID PokeAPI (form, mega, biến thể vùng miền...).
+smogon_fetch.py tạo bảng lúc ingest từ mọi tên xuất hiện trong stats; bot chỉ việc tra dict.
+Không import aiohttp / disnake để dùng chung cho script ingest và PokeApiService.
+"""
+import json
+import os
+import unicodedata
+from bisect import bisect_left
+from modules.storage import sanitize_key
+
+REFERENCE_FILE = "modules/pokemon_modules/pokemon_name.json"
+ALIAS_FILE = "modules/pokemon_modules/pokemon_alias.json"
+# Tên Smogon không suy ra được bằng quy tắc chung (slug -> tên PokeAPI)
+OVERRIDES = {
+    "greninja-bond": "greninja-battle-bond",
+}
+# Smogon viết tắt giới tính của form: Indeedee-F, Meowstic-M...
+GENDER = {"f": "female", "m": "male"}
+
+def slug_name(name: str) -> str:
+    """'Mr. Mime-Galar' -> 'mr-mime-galar', 'Flabébé' -> 'flabebe', 'Zygarde-10%' -> 'zygarde-10'."""
+    name = unicodedata.normalize("NFKD", name).encode("ascii", "ignore").decode()
+    name = name.lower().strip().replace(" ", "-")
+    for ch in ".:'%":
+        name = name.replace(ch, "")
+    return name
+
+def add_name(name: str, out: set) -> None:
+    # Cả tên gốc ("Mr. Mime", trong teammates / counters) lẫn key đã sanitize trên Firebase
+    # ("Mr Mime", tên /pokemon_search nhận được) đều tra thẳng được trong bảng
+    out.add(name)
+    out.add(sanitize_key(name))
+
+def record_names(pokemon: dict, out: set) -> set:
+    """Thêm vào `out` mọi tên Pokemon trong {tên: record} của một rating (kể cả teammates / counters)."""
+    for name, data in pokemon.items():
+        add_name(name, out)
+        sections = (data or {}).get("sections", {})
+        for item in sections.get("Teammates", []):
+            if item.get("name"): add_name(item["name"], out)
+        for item in sections.get("Checks and Counters", []):
+            opp = item.get("opponent") or item.get("name")
+            if opp: add_name(opp, out)
+    return out
+
+class AliasResolver:
+    """
+    Suy ra ID PokeAPI cho một tên Smogon theo thứ tự:
+    tên khớp hẳn -> đổi -f/-m thành -female/-male -> form mặc định có hậu tố ('landorus' -> 'landorus-incarnate',
+    'ogerpon-wellspring' -> 'ogerpon-wellspring-mask') -> bỏ dần hậu tố Smogon không có trên PokeAPI
+    ('sinistcha-masterpiece' -> 'sinistcha', 'ogerpon-cornerstone-tera' -> 'ogerpon-cornerstone-mask').
+    """
+
+    def __init__(self, pokemon_map: dict):
+        self.pokemon_map = pokemon_map
+        self.names = sorted(pokemon_map)
+
+    def by_prefix(self, slug: str):
+        """ID nhỏ nhất (form mặc định) trong các tên PokeAPI bắt đầu bằng `slug-`."""
+        prefix = slug + "-"
+        best = None
+        i = bisect_left(self.names, prefix)
+        while i < len(self.names) and self.names[i].startswith(prefix):
+            p_id = self.pokemon_map[self.names[i]]
+            if best is None or p_id < best: best = p_id
+            i += 1
+        return best
+
+    def candidates(self, slug: str):
+        parts = slug.split("-")
+        yield slug
+        if len(parts) > 1 and parts[-1] in GENDER:
+            yield "-".join(parts[:-1] + [GENDER[parts[-1]]])
+        for n in range(len(parts) - 1, 0, -1):
+            yield "-".join(parts[:n])
+
+    def resolve(self, name: str):
+        slug = slug_name(name)
+        slug = OVERRIDES.get(slug, slug)
+        for cand in self.candidates(slug):
+            p_id = self.pokemon_map.get(cand)
+            if p_id is None: p_id = self.by_prefix(cand)
+            if p_id is not None: return p_id
+        return None
+
+def build_aliases(names, pokemon_map: dict):
+    """{tên Smogon: ID} cho mọi tên resolve được, kèm danh sách tên không resolve được."""
+    resolver = AliasResolver(pokemon_map)
+    table, missing = {}, []
+    for name in sorted(names):
+        p_id = resolver.resolve(name)
+        if p_id is None: missing.append(name)
+        else: table[name] = p_id
+    return table, missing
+
+def load_json(path: str) -> dict:
+    if not os.path.exists(path): return {}
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+def write_aliases(names, path: str = ALIAS_FILE, reference_file: str = REFERENCE_FILE):
+    """Gộp `names` với các tên đã có trong file alias, resolve lại toàn bộ rồi ghi đè file."""
+    pokemon_map = load_json(reference_file)
+    if not pokemon_map:
+        print(f"[ERR] Không có {reference_file} (chạy pokemon_references.py trước), bỏ qua bảng alias")
+        return None
+    table, missing = build_aliases(set(names) | set(load_json(path)), pokemon_map)
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(table, f, ensure_ascii=False, indent=1)
+    print(f"[OK] Alias: {len(table)} tên -> {path}" + (f" ({len(missing)} không resolve được: {', '.join(missing[:10])})" if missing else ""))
+    return table
@@ -0,0 +1,142 @@
+import asyncio
+import json
+import os
+import sqlite3
+import threading
+import time
+
+CACHE_FILE = os.getenv("POKEAPI_CACHE_FILE", ".pokeapi_cache.sqlite3")
+TTL = 30 * 86400             # giây; data PokeAPI gần như không đổi -> trong hạn này không gọi API
+STALE_TTL = 365 * 86400      # quá TTL nhưng chưa quá hạn này: trả bản cũ ngay, làm mới ở nền
+MISSING_TTL = 86400          # 404 (tên sai, form không có) cũng được cache, nhưng ngắn hơn
+MAX_BYTES = 64 * 1024 * 1024 # tổng kích thước body tối đa trong file cache
+TOUCH_INTERVAL = 3600        # thời điểm truy cập (cho LRU) chỉ ghi lại tối đa mỗi giờ một lần
+
+class ApiCache:
+    """
+    Cache response API trên đĩa (SQLite), key là URL endpoint.
+    - Còn hạn TTL: trả thẳng từ file, 0 request.
+    - Quá TTL, còn hạn STALE_TTL: trả bản cũ ngay và làm mới ở nền (stale-while-revalidate).
+    - Không có / quá hạn: tải; API lỗi thì dùng tạm bản cũ nếu có.
+    Tổng kích thước giới hạn theo MAX_BYTES, vượt thì bỏ các URL lâu không dùng nhất.
+    Nhiều lời gọi cùng URL trong lúc đang tải chỉ tạo một request (single-flight).
+    Đọc / ghi SQLite chạy trong thread (như SQLiteStorage) để không chặn event loop.
+    """
+
+    def __init__(self, path: str = CACHE_FILE, ttl: float = TTL, stale_ttl: float = STALE_TTL,
+                 missing_ttl: float = MISSING_TTL, max_bytes: int = MAX_BYTES):
+        self.path = path
+        self.ttl = ttl
+        self.stale_ttl = stale_ttl
+        self.missing_ttl = missing_ttl
+        self.max_bytes = max_bytes
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.execute("CREATE TABLE IF NOT EXISTS responses (url TEXT PRIMARY KEY, body TEXT NOT NULL, "
+                          "fetched REAL NOT NULL, accessed REAL NOT NULL, size INTEGER NOT NULL) WITHOUT ROWID")
+        self.conn.execute("CREATE INDEX IF NOT EXISTS responses_accessed ON responses (accessed)")
+        self.size = self.conn.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+        self.inflight = {}      # url -> asyncio.Future của lần tải đang chạy
+        self.background = set() # task làm mới ở nền (giữ reference để không bị GC)
+        self.hits = 0
+        self.stale = 0
+        self.misses = 0
+        self.errors = 0
+        self.evictions = 0
+
+    def lookup(self, url: str):
+        """(value, tuổi tính bằng giây) hoặc None nếu chưa cache."""
+        with self.lock:
+            row = self.conn.execute("SELECT body, fetched, accessed FROM responses WHERE url = ?", (url,)).fetchone()
+            if row is None: return None
+            body, fetched, accessed = row
+            now = time.time()
+            if now - accessed > TOUCH_INTERVAL:
+                self.conn.execute("UPDATE responses SET accessed = ? WHERE url = ?", (now, url))
+        return json.loads(body), now - fetched
+
+    def store(self, url: str, value) -> None:
+        body = json.dumps(value, ensure_ascii=False, separators=(",", ":"))
+        size = len(body)
+        if size > self.max_bytes: return
+        now = time.time()
+        with self.lock:
+            old = self.conn.execute("SELECT size FROM responses WHERE url = ?", (url,)).fetchone()
+            self.conn.execute("INSERT OR REPLACE INTO responses (url, body, fetched, accessed, size) VALUES (?, ?, ?, ?, ?)",
+                              (url, body, now, now, size))
+            self.size += size - (old[0] if old else 0)
+            if self.size > self.max_bytes: self.evict()
+
+    def evict(self) -> None:
+        """
+        Bỏ các URL lâu không dùng nhất tới khi còn 90% MAX_BYTES (để không phải evict sau mỗi lần ghi).
+        Gọi khi đang giữ self.lock.
+        """
+        target = self.max_bytes * 0.9
+        victims = []
+        for url, size in self.conn.execute("SELECT url, size FROM responses ORDER BY accessed"):
+            if self.size <= target: break
+            victims.append((url,))
+            self.size -= size
+        self.conn.executemany("DELETE FROM responses WHERE url = ?", victims)
+        self.evictions += len(victims)
+
+    async def get(self, url: str, fetch):
+        """
+        `fetch`: coroutine function () -> (ok, value). ok=False là lỗi tạm thời (mạng, 5xx) và không
+        được cache; value=None là endpoint không tồn tại (404).
+        """
+        entry = await asyncio.to_thread(self.lookup, url)
+        if entry is not None:
+            value, age = entry
+            if age < (self.ttl if value is not None else self.missing_ttl):
+                self.hits += 1
+                return value
+            if value is not None and age < self.stale_ttl:
+                self.stale += 1
+                self.revalidate(url, fetch)
+                return value
+
+        self.misses += 1
+        ok, value = await self.load(url, fetch)
+        if ok: return value
+        return entry[0] if entry is not None else None
+
+    def revalidate(self, url: str, fetch) -> None:
+        if url in self.inflight: return
+        task = asyncio.create_task(self.load(url, fetch))
+        self.background.add(task)
+        task.add_done_callback(self.background.discard)
+
+    async def load(self, url: str, fetch):
+        future = self.inflight.get(url)
+        if future is not None:
+            return await asyncio.shield(future)
+
+        future = asyncio.get_running_loop().create_future()
+        self.inflight[url] = future
+        try:
+            try:
+                result = await fetch()
+            except Exception as e:
+                print(f"[PokeAPI-CACHE-ERR] {url}: {e!r}")
+                result = (False, None)
+            if result[0]: await asyncio.to_thread(self.store, url, result[1])
+            else: self.errors += 1
+            future.set_result(result)
+            return result
+        finally:
+            if not future.done(): future.cancel()
+            del self.inflight[url]
+
+    def summary(self) -> str:
+        with self.lock:
+            count = self.conn.execute("SELECT COUNT(*) FROM responses").fetchone()[0]
+        return (f"{count} URLs, {self.size // 1024} KB, {self.hits} hits, {self.stale} stale, "
+                f"{self.misses} misses, {self.errors} errors, {self.evictions} evicted")
+
+    def close(self) -> None:
+        with self.lock:
+            self.conn.close()
@@ -0,0 +1,113 @@
+"""
+Cache gen -> format -> rating -> [tên Pokemon] dạng gọn cho PokemonService.
+- Một bảng tên chung (đã sort, intern) cho mọi format; mỗi rating chỉ giữ array chỉ số
+  (2 byte / tên) theo đúng thứ tự usage, array trùng nhau giữa các rating được dùng chung.
+- Rating của mỗi format được sort một lần lúc dựng thay vì mỗi lần autocomplete.
+Dựng từ / xuất ra dict lồng nhau cũ nên snapshot trên đĩa giữ nguyên định dạng.
+"""
+import sys
+from array import array
+from . import aggregate
+
+class _Format:
+    __slots__ = ("ratings", "buckets")
+
+    def __init__(self, ratings: list, buckets: dict):
+        self.ratings = ratings  # rating thật, đã sort (không có "all")
+        self.buckets = buckets  # rating -> array chỉ số vào CompactCache.names
+
+def nested_size(nested: dict) -> int:
+    """Bộ nhớ (byte, theo sys.getsizeof) của dict lồng nhau gen/format/rating -> list tên."""
+    seen = set()
+    total = 0
+    def add(obj):
+        nonlocal total
+        if id(obj) not in seen:
+            seen.add(id(obj))
+            total += sys.getsizeof(obj)
+    add(nested)
+    for gen, formats in nested.items():
+        add(gen); add(formats)
+        for fmt, ratings in formats.items():
+            add(fmt); add(ratings)
+            for rating, names in ratings.items():
+                add(rating); add(names)
+                for name in names: add(name)
+    return total
+
+class CompactCache:
+    def __init__(self, nested: dict = None):
+        nested = nested or {}
+        unique = set()
+        for formats in nested.values():
+            for ratings in formats.values():
+                for names in ratings.values():
+                    unique.update(names)
+        self.names = [sys.intern(n) for n in sorted(unique)]
+        ids = {name: i for i, name in enumerate(self.names)}
+        typecode = "H" if len(self.names) <= 0xFFFF else "I"
+
+        shared = {}  # bytes -> array, để các rating có cùng danh sách dùng chung một array
+        self.gens = {}
+        for gen, formats in nested.items():
+            gen_formats = self.gens[sys.intern(gen)] = {}
+            for fmt, ratings in formats.items():
+                buckets = {}
+                for rating, names in ratings.items():
+                    arr = array(typecode, map(ids.__getitem__, names))
+                    buckets[sys.intern(rating)] = shared.setdefault(arr.tobytes(), arr)
+                gen_formats[sys.intern(fmt)] = _Format(aggregate.sort_ratings(buckets), buckets)
+        self.bucket_count = sum(len(f.buckets) for formats in self.gens.values() for f in formats.values())
+        self.unique_buckets = len(shared)
+        self.source_bytes = nested_size(nested)
+
+    def __len__(self):
+        return len(self.gens)
+
+    def __eq__(self, other):
+        return isinstance(other, CompactCache) and self.to_dict() == other.to_dict()
+
+    def formats(self, gen: str) -> list:
+        return list(self.gens.get(gen, ()))
+
+    def _format(self, gen: str, fmt: str):
+        return self.gens.get(gen, {}).get(fmt)
+
+    def ratings(self, gen: str, fmt: str) -> list:
+        f = self._format(gen, fmt)
+        return f.ratings if f else []
+
+    def has_rating(self, gen: str, fmt: str, rating: str) -> bool:
+        f = self._format(gen, fmt)
+        return f is not None and rating in f.buckets
+
+    def pokemons(self, gen: str, fmt: str, rating: str) -> list:
+        f = self._format(gen, fmt)
+        arr = f.buckets.get(rating) if f else None
+        return list(map(self.names.__getitem__, arr)) if arr is not None else []
+
+    def format_dict(self, gen: str, fmt: str) -> dict:
+        """{rating: [tên]} của một format (dạng dict cũ)."""
+        f = self._format(gen, fmt)
+        return {r: self.pokemons(gen, fmt, r) for r in f.buckets} if f else {}
+
+    def to_dict(self) -> dict:
+        return {gen: {fmt: self.format_dict(gen, fmt) for fmt in formats} for gen, formats in self.gens.items()}
+
+    def footprint(self) -> int:
+        """Bộ nhớ (byte) của cấu trúc gọn: bảng tên, các array (tính một lần) và dict."""
+        seen = set()
+        total = sys.getsizeof(self.names) + sum(sys.getsizeof(n) for n in self.names) + sys.getsizeof(self.gens)
+        for formats in self.gens.values():
+            total += sys.getsizeof(formats)
+            for f in formats.values():
+                total += sys.getsizeof(f) + sys.getsizeof(f.ratings) + sys.getsizeof(f.buckets)
+                for arr in f.buckets.values():
+                    if id(arr) not in seen:
+                        seen.add(id(arr))
+                        total += sys.getsizeof(arr)
+        return total
+
+    def summary(self) -> str:
+        return (f"{len(self.names)} names, {self.bucket_count} buckets ({self.unique_buckets} unique), "
+                f"{self.footprint() / 1024:.0f} KB (nested lists: {self.source_bytes / 1024:.0f} KB)")
@@ -1,192 +1,266 @@
-import requests
 import asyncio
-import concurrent.futures
-from functools import partial
+import json
+import os
 import re
-from urllib.parse import quote
+import time
+from . import aggregate
+from .compact_cache import CompactCache
+from .result_cache import ResultCache
+from .search_index import SearchIndex
+from modules.storage import Storage, get_storage, join_path, split_path
 
-FIREBASE_URL = "https://vo-robin-default-rtdb.asia-southeast1.firebasedatabase.app/pokemondata"
+DATA_ROOT = "pokemondata"
+# pokemonusage/{fmt}/{rating}: tên Pokemon theo usage giảm dần (upload_firebase ghi kèm data)
+USAGE_ROOT = "pokemonusage"
+# Snapshot của cache gen/format/rating -> tên Pokemon, để khởi động lại là có autocomplete ngay
+SNAPSHOT_FILE = "modules/pokemon_modules/cache_snapshot.json"
+# Gom các event stream trong khoảng này thành một lần dựng lại cache (một lần upload = hàng trăm event)
+STREAM_DEBOUNCE = 2.0
+
+def split_format(fmt_full: str):
+    """"gen9ou" -> ("gen9", "ou"); None nếu không phải tên format."""
+    match = re.match(r"(gen[1-9])(.+)", fmt_full)
+    if not match: return None
+    gen_key, fmt_key = match.group(1), match.group(2)
+    if fmt_key.startswith("-"): fmt_key = fmt_key[1:]
+    return gen_key, fmt_key
+
+def usage_ratings(usage) -> dict:
+    """Node pokemonusage/{fmt} -> {rating: [tên theo usage]}."""
+    if isinstance(usage, list):
+        # Firebase tự đổi object có key dạng số thành mảng
+        usage = {str(i): names for i, names in enumerate(usage) if names}
+    if not isinstance(usage, dict): return {}
+    out = {}
+    for rating, names in usage.items():
+        if isinstance(names, dict):
+            # Mảng đã bị sửa từng phần tử (patch) -> object key "0", "1", ...
+            names = [names[k] for k in sorted(names, key=lambda k: int(k) if k.isdigit() else -1)]
+        if names: out[rating] = [n for n in names if n]
+    return out
 
 class PokemonService:
-    def __init__(self):
-        self.cache = {}
+    def __init__(self, storage: Storage = None, snapshot_file: str = SNAPSHOT_FILE):
+        self.cache = CompactCache()
         self.is_ready = False
-        self.session = requests.Session()
-        self.main_executor = concurrent.futures.ThreadPoolExecutor(max_workers=5)
+        # Firebase REST (mặc định) / SQLite / memory, xem modules/storage
+        self.storage = storage or get_storage()
+        # Kết quả tra cứu (kể cả "all") theo (gen, fmt, rating, pokemon)
+        self.result_cache = ResultCache()
+        self.snapshot_file = snapshot_file
+        self.refresh_task = None
+        # Theo dõi pokemonusage: upload mới được áp dụng vào cache ngay, không cần build lại toàn bộ
+        self.usage_view = None
+        self.stream_dirty = set()
+        self.stream_apply_task = None
+        # SearchIndex cho autocomplete, dựng lần đầu cần đến; xoá mỗi khi self.cache đổi
+        self.search_indexes = {}
+        self.load_snapshot()
+
+    # --- SNAPSHOT ---
+    def load_snapshot(self):
+        if not self.snapshot_file or not os.path.exists(self.snapshot_file): return
+        try:
+            with open(self.snapshot_file, "r", encoding="utf-8") as f:
+                snapshot = json.load(f)
+            self.cache = CompactCache(snapshot["cache"])
+            self.search_indexes = {}
+            self.is_ready = True
+            age = (time.time() - snapshot.get("saved_at", 0)) / 3600
+            print(f"[CACHE] Loaded snapshot ({len(self.cache)} gens, {age:.1f}h old): {self.cache.summary()}")
+        except (OSError, ValueError, KeyError) as e:
+            print(f"[CACHE] Snapshot unreadable, ignoring: {e}")
+
+    def _save_snapshot_sync(self, cache):
+        tmp_path = self.snapshot_file + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({"saved_at": time.time(), "cache": cache}, f, ensure_ascii=False, separators=(",", ":"))
+        os.replace(tmp_path, self.snapshot_file)
 
-    def _fetch_sync(self, url):
+    async def save_snapshot(self, cache):
+        if not self.snapshot_file: return
         try:
-            # [LOG] Log URL gọi đi
-            # print(f"[FIREBASE-REQ] GET {url}") 
-            r = self.session.get(url, timeout=5)
-            if r.status_code == 200:
-                return r.json()
-            return None
-        except Exception as e:
-            print(f"[FIREBASE-ERR] Fetch fail: {e}")
-            return None
-
-    def _build_cache_sync(self):
+            await asyncio.to_thread(self._save_snapshot_sync, cache)
+        except OSError as e:
+            print(f"[CACHE] Could not save snapshot: {e}")
+
+    def start_background_refresh(self):
+        """Làm mới cache từ Firebase ở nền (mỗi lần chỉ một task); cache cũ vẫn dùng được trong lúc chờ."""
+        if self.refresh_task is None or self.refresh_task.done():
+            self.refresh_task = asyncio.get_running_loop().create_task(self.build_cache())
+        return self.refresh_task
+
+    async def _fetch(self, *path, shallow=False):
+        # [LOG] Log URL gọi đi
+        # print(f"[FIREBASE-REQ] GET {join_path(DATA_ROOT, *path)}")
+        return await self.storage.get(join_path(DATA_ROOT, *path), shallow=shallow)
+
+    async def build_cache(self):
         print("[CACHE] Starting data fetch (Parallel Requests)...")
-        all_formats = self._fetch_sync(f"{FIREBASE_URL}.json?shallow=true")
-        if not all_formats: return
+        all_formats = await self._fetch(shallow=True)
+        if not all_formats:
+            print("[CACHE] Refresh failed, keeping current cache.")
+            return
+        old_cache = self.cache
 
         temp_cache = {}
-        with concurrent.futures.ThreadPoolExecutor(max_workers=20) as http_executor:
-            future_to_fmt = {}
-            for fmt_full in all_formats.keys():
-                match = re.match(r"(gen[1-9])(.+)", fmt_full)
-                if not match: continue
-                gen_key, fmt_key = match.group(1), match.group(2)
-                if fmt_key.startswith("-"): fmt_key = fmt_key[1:]
-
-                if gen_key not in temp_cache: temp_cache[gen_key] = {}
-                if fmt_key not in temp_cache[gen_key]: temp_cache[gen_key][fmt_key] = {}
-
-                future = http_executor.submit(self._fetch_sync, f"{FIREBASE_URL}/{fmt_full}.json?shallow=true")
-                future_to_fmt[future] = (gen_key, fmt_key, fmt_full)
-
-            pokemon_tasks = {}
-            for future in concurrent.futures.as_completed(future_to_fmt):
-                gen, fmt, fmt_full = future_to_fmt[future]
-                ratings = future.result()
-                if ratings:
-                    for rating in ratings:
-                        p_future = http_executor.submit(self._fetch_sync, f"{FIREBASE_URL}/{fmt_full}/{rating}.json?shallow=true")
-                        pokemon_tasks[p_future] = (gen, fmt, rating)
-
-            for future in concurrent.futures.as_completed(pokemon_tasks):
-                gen, fmt, rating = pokemon_tasks[future]
-                p_data = future.result()
-                if p_data:
-                    temp_cache[gen][fmt][rating] = list(p_data.keys())
-
-        self.cache = temp_cache
+        fmt_jobs = []
+        for fmt_full in all_formats.keys():
+            split = split_format(fmt_full)
+            if not split: continue
+            gen_key, fmt_key = split
+
+            if gen_key not in temp_cache: temp_cache[gen_key] = {}
+            if fmt_key not in temp_cache[gen_key]: temp_cache[gen_key][fmt_key] = {}
+            fmt_jobs.append((gen_key, fmt_key, fmt_full))
+
+        all_ratings, all_usage = await asyncio.gather(
+            asyncio.gather(*(self._fetch(fmt_full, shallow=True) for _, _, fmt_full in fmt_jobs)),
+            asyncio.gather(*(self.storage.get(join_path(USAGE_ROOT, fmt_full)) for _, _, fmt_full in fmt_jobs)))
+
+        rating_jobs = []
+        for (gen, fmt, fmt_full), ratings, usage in zip(fmt_jobs, all_ratings, all_usage):
+            usage = usage_ratings(usage)
+            if ratings:
+                for rating in ratings:
+                    names = usage.get(rating)
+                    # Có danh sách usage thì không cần shallow từng rating (data upload cũ thì chưa có)
+                    if names: temp_cache[gen][fmt][rating] = names
+                    else: rating_jobs.append((gen, fmt, fmt_full, rating))
+            elif ratings is None:
+                # Request lỗi: giữ dữ liệu cũ của format này thay vì làm mất nó
+                temp_cache[gen][fmt] = old_cache.format_dict(gen, fmt)
+
+        all_pokemons = await asyncio.gather(*(self._fetch(fmt_full, rating, shallow=True)
+                                              for _, _, fmt_full, rating in rating_jobs))
+        for (gen, fmt, _, rating), p_data in zip(rating_jobs, all_pokemons):
+            if p_data:
+                temp_cache[gen][fmt][rating] = list(p_data.keys())
+            elif p_data is None and old_cache.has_rating(gen, fmt, rating):
+                temp_cache[gen][fmt][rating] = old_cache.pokemons(gen, fmt, rating)
+
+        if self.usage_view is not None and self.usage_view.ready:
+            # Stream có thể đã nhận upload mới hơn lúc các GET ở trên chạy
+            self._merge_usage(temp_cache, list(self.usage_view.get() or {}))
+        await self._swap_cache(temp_cache)
+
+    async def _swap_cache(self, nested: dict):
+        # Đổi cả cache một lần (autocomplete không bao giờ thấy cache dựng dở)
+        # Mỗi lần làm mới / stream đổi dữ liệu đều bỏ kết quả tra cứu cũ: record của Pokemon có thể
+        # đã đổi dù danh sách tên thì không
+        new_cache = CompactCache(nested)
+        self.result_cache.clear()
+        self.cache = new_cache
+        self.search_indexes = {}
         self.is_ready = True
-        print(f"[CACHE] Complete.")
+        print(f"[CACHE] Complete: {new_cache.summary()}")
+        await self.save_snapshot(nested)
 
-    async def build_cache(self):
-        loop = asyncio.get_running_loop()
-        await loop.run_in_executor(self.main_executor, self._build_cache_sync)
+    # --- STREAM ---
+    def start_usage_stream(self):
+        """Theo dõi pokemonusage (Firebase: REST streaming); chỉ format/rating thay đổi được cập nhật."""
+        if self.usage_view is None:
+            self.usage_view = self.storage.watch(USAGE_ROOT, self._on_usage_change)
+        return self.usage_view
+
+    def _on_usage_change(self, event: str, path: str, data):
+        parts = split_path(path)
+        if parts:
+            self.stream_dirty.add(parts[0])
+        elif isinstance(data, dict):
+            # put "/" (kết nối lại) hoặc patch nhiều path ở root: key đầu của mỗi path là format
+            self.stream_dirty.update(split_path(key)[0] for key in data if split_path(key))
+        if self.stream_apply_task is None or self.stream_apply_task.done():
+            self.stream_apply_task = asyncio.get_running_loop().create_task(self._apply_usage_changes())
 
-    def get_gens_cached(self) -> list[str]: return list(self.cache.keys())
-    def get_formats_cached(self, gen: str) -> list[str]: return list(self.cache[gen].keys()) if gen in self.cache else []
+    async def _apply_usage_changes(self):
+        await asyncio.sleep(STREAM_DEBOUNCE)
+        formats, self.stream_dirty = self.stream_dirty, set()
+        nested = self.cache.to_dict()
+        if self._merge_usage(nested, formats):
+            print(f"[CACHE] Stream update: {len(formats)} formats changed.")
+            await self._swap_cache(nested)
+        elif formats:
+            # Danh sách tên không đổi nhưng record của các format này có thể đã được upload lại
+            self.result_cache.clear()
+
+    def _merge_usage(self, nested: dict, formats) -> bool:
+        """
+        Thay các rating của từng format trong `formats` bằng đúng danh sách usage trong stream
+        (rating bị xoá thì mất khỏi cache; format không còn trong stream thì bị bỏ hẳn).
+        """
+        changed = False
+        for fmt_full in formats:
+            split = split_format(fmt_full)
+            if not split: continue
+            gen, fmt = split
+            ratings = usage_ratings(self.usage_view.get(fmt_full))
+            if nested.get(gen, {}).get(fmt, {}) == ratings: continue
+            changed = True
+            if ratings:
+                nested.setdefault(gen, {})[fmt] = ratings
+            else:
+                del nested[gen][fmt]
+                if not nested[gen]: del nested[gen]
+        return changed
+
+    def get_gens_cached(self) -> list[str]: return list(self.cache.gens)
+    def get_formats_cached(self, gen: str) -> list[str]: return self.cache.formats(gen)
     def get_ratings_cached(self, gen: str, fmt: str) -> list[str]:
-        if gen in self.cache and fmt in self.cache[gen]:
-            ratings = list(self.cache[gen][fmt].keys())
-            try: ratings.sort(key=int)
-            except: pass
-            return ratings
-        return []
+        # Đã sort sẵn lúc dựng cache; "all" (bản tính sẵn lúc upload) không phải rating thật
+        return list(self.cache.ratings(gen, fmt))
+    def has_precomputed_all(self, gen: str, fmt: str) -> bool:
+        return self.cache.has_rating(gen, fmt, aggregate.ALL_RATING)
     def get_pokemons_cached(self, gen: str, fmt: str, rating: str) -> list[str]:
-        if gen in self.cache and fmt in self.cache[gen]:
-            if rating == "all":
-                ratings = self.get_ratings_cached(gen, fmt)
-                if ratings: return self.cache[gen][fmt].get(ratings[-1], [])
-            else:
-                return self.cache[gen][fmt].get(rating, [])
-        return []
+        if rating == "all" and not self.has_precomputed_all(gen, fmt):
+            ratings = self.cache.ratings(gen, fmt)
+            return self.cache.pokemons(gen, fmt, ratings[-1]) if ratings else []
+        return self.cache.pokemons(gen, fmt, rating)
+
+    # --- AUTOCOMPLETE ---
+    def _search_index(self, key: tuple, load_names) -> SearchIndex:
+        index = self.search_indexes.get(key)
+        if index is None:
+            index = self.search_indexes[key] = SearchIndex(load_names())
+        return index
+
+    def search_formats(self, gen: str, query: str, limit: int = 25) -> list[str]:
+        return self._search_index(("format", gen), lambda: self.get_formats_cached(gen)).search(query, limit)
+
+    def search_pokemons(self, gen: str, fmt: str, rating: str, query: str, limit: int = 25) -> list[str]:
+        """Tên bắt đầu bằng `query` trước, rồi tên chứa `query`; mỗi nhóm theo usage."""
+        index = self._search_index(("pokemon", gen, fmt, rating), lambda: self.get_pokemons_cached(gen, fmt, rating))
+        return index.search(query, limit)
 
     # --- LOGIC TÍNH TRUNG BÌNH ---
-    def _fetch_average_data_sync(self, gen, fmt, pokemon):
+    async def _fetch_average_data(self, gen, fmt, pokemon):
         ratings = self.get_ratings_cached(gen, fmt)
         if not ratings: return None
         full_fmt = f"{gen}{fmt}"
         
-        safe_pokemon = quote(pokemon)
         # [LOG]
-        print(f"[DEBUG-FIREBASE] Calc Average for '{pokemon}' -> Safe: '{safe_pokemon}'")
-
-        results = []
-        with concurrent.futures.ThreadPoolExecutor(max_workers=5) as executor:
-            futures = [executor.submit(self._fetch_sync, f"{FIREBASE_URL}/{full_fmt}/{r}/{safe_pokemon}.json") for r in ratings]
-            for future in concurrent.futures.as_completed(futures):
-                data = future.result()
-                if data: results.append(data)
+        print(f"[DEBUG-FIREBASE] Calc Average for '{pokemon}' over {len(ratings)} ratings")
 
+        fetched = await asyncio.gather(*(self._fetch(full_fmt, r, pokemon) for r in ratings))
+        results = [data for data in fetched if data]
         if not results: return None
-
-        total_raw_count = sum(d.get("raw_count", 0) for d in results)
-        if total_raw_count == 0: total_raw_count = 1
-
-        agg_sections = {
-            "Moves": {}, "Abilities": {}, "Items": {}, 
-            "Spreads": {}, "Tera Types": {}, "Teammates": {}
-        }
-        
-        agg_counters = {} 
-
-        for data in results:
-            weight = data.get("raw_count", 0)
-            sections = data.get("sections", {})
-            
-            for sec_name in agg_sections.keys():
-                items = sections.get(sec_name, [])
-                for item in items:
-                    name = item.get("name")
-                    pct = item.get("pct", 0)
-                    if name:
-                        if name not in agg_sections[sec_name]: agg_sections[sec_name][name] = 0.0
-                        agg_sections[sec_name][name] += (pct * weight)
-
-            counters = sections.get("Checks and Counters", [])
-            for c in counters:
-                opp = c.get("opponent") or c.get("name")
-                if not opp: continue
-                
-                raw = c.get("raw", "")
-                score = 0
-                match = re.search(r"([\d\.]+)", raw)
-                if match: score = float(match.group(1))
-                
-                if opp not in agg_counters:
-                    agg_counters[opp] = {"weighted_score": 0.0, "detail": c.get("detail", ""), "max_weight": 0}
-                
-                agg_counters[opp]["weighted_score"] += (score * weight)
-                
-                if weight > agg_counters[opp]["max_weight"]:
-                    agg_counters[opp]["detail"] = c.get("detail", "")
-                    agg_counters[opp]["max_weight"] = weight
-
-        final_sections = {}
-        for sec_name, name_map in agg_sections.items():
-            final_list = [{"name": name, "pct": val / total_raw_count} for name, val in name_map.items()]
-            final_list.sort(key=lambda x: x["pct"], reverse=True)
-            final_sections[sec_name] = final_list
-
-        final_counters = []
-        for opp, val in agg_counters.items():
-            avg_score = val["weighted_score"] / total_raw_count
-            final_counters.append({
-                "opponent": opp,
-                "pct": avg_score,
-                "detail": val["detail"]
-            })
-        
-        final_counters.sort(key=lambda x: x["pct"], reverse=True)
-        final_sections["Checks and Counters"] = final_counters
-
-        return {
-            "name": pokemon,
-            "raw_count": total_raw_count,
-            "info": f"Weighted average from {len(results)} ratings ({', '.join(ratings)})",
-            "sections": final_sections
-        }
+        return aggregate.weighted_average(pokemon, ratings, results)
 
     async def get_pokemon_data_async(self, gen: str, fmt: str, rating: str, pokemon: str):
         print(f"[DEBUG-FIREBASE] get_pokemon_data_async CALLED. Input: {pokemon}")
+        key = (gen, fmt, rating, pokemon)
+        return await self.result_cache.get_or_load(key, lambda: self._load_pokemon_data(gen, fmt, rating, pokemon))
+
+    def cache_stats(self) -> dict:
+        return self.result_cache.stats()
+
+    async def _load_pokemon_data(self, gen: str, fmt: str, rating: str, pokemon: str):
         full_fmt = f"{gen}{fmt}"
         
-        if rating == "all":
-            loop = asyncio.get_running_loop()
-            return await loop.run_in_executor(self.main_executor, partial(self._fetch_average_data_sync, gen, fmt, pokemon))
+        if rating == "all" and not self.has_precomputed_all(gen, fmt):
+            # Data cũ chưa có rating "all" tính sẵn -> tính trực tiếp từ các rating
+            return await self._fetch_average_data(gen, fmt, pokemon)
 
-        safe_pokemon = quote(pokemon)
         # [LOG]
-        print(f"[DEBUG-FIREBASE] Single Fetch -> Safe Name: '{safe_pokemon}'")
-        
-        url = f"{FIREBASE_URL}/{full_fmt}/{rating}/{safe_pokemon}.json"
-        print(f"[DEBUG-FIREBASE] URL: {url}")
-        
-        loop = asyncio.get_running_loop()
-        return await loop.run_in_executor(self.main_executor, partial(self._fetch_sync, url))
\ No newline at end of file
+        print(f"[DEBUG-FIREBASE] Path: {join_path(DATA_ROOT, full_fmt, rating, pokemon)} ({self.storage.name})")
+        return await self._fetch(full_fmt, rating, pokemon)
\ No newline at end of file
@@ -2,14 +2,59 @@ import aiohttp
 import asyncio
 import json
 import os
+from .aliases import ALIAS_FILE, REFERENCE_FILE, AliasResolver, slug_name
+from .api_cache import ApiCache
+from .pokedex import Pokedex
 
 POKEAPI_URL = "https://pokeapi.co/api/v2"
-REFERENCE_FILE = "modules/pokemon_modules/pokemon_name.json" 
+# Official artwork của mọi Pokemon gốc (ID quốc gia < 10000) nằm ở URL cố định theo ID;
+# form (ID >= 10000: mega, gmax, regional...) có thể không có artwork nên phải hỏi PokeAPI
+ARTWORK_URL = "https://raw.githubusercontent.com/PokeAPI/sprites/master/sprites/pokemon/other/official-artwork/{}.png"
+FORM_ID_START = 10000
+
+def artwork_url(p_data: dict) -> str:
+    sprites = p_data.get("sprites", {})
+    return (sprites.get("other", {}).get("official-artwork", {}).get("front_default") or 
+            sprites.get("other", {}).get("home", {}).get("front_default") or
+            sprites.get("front_default"))
+
+def english(entries: list) -> list:
+    # Chỉ giữ entry tiếng Anh đầu tiên (flavor text / genus)
+    for entry in entries or []:
+        if entry.get("language", {}).get("name") == "en":
+            return [entry]
+    return []
+
+def slim_payload(url: str, data: dict) -> dict:
+    """
+    Chỉ giữ các field bot dùng trước khi ghi cache (payload /pokemon đầy đủ hàng trăm KB vì moves,
+    game_indices...). Giữ nguyên cấu trúc nên code đọc payload không phải đổi.
+    """
+    endpoint = url[len(POKEAPI_URL):].strip("/").split("/")[0]
+    if endpoint == "pokemon":
+        return {
+            "id": data["id"], "name": data["name"], "types": data["types"],
+            "height": data["height"], "weight": data["weight"], "stats": data["stats"],
+            "species": {"url": data.get("species", {}).get("url")},
+            "sprites": {"front_default": data.get("sprites", {}).get("front_default"),
+                        "other": {"official-artwork": {"front_default": artwork_url(data)}}},
+        }
+    if endpoint == "pokemon-species":
+        return {"flavor_text_entries": english(data.get("flavor_text_entries")),
+                "genera": english(data.get("genera"))}
+    if endpoint == "move":
+        return {"type": data["type"], "damage_class": data["damage_class"]}
+    return data
 
 class PokeApiService:
-    def __init__(self):
+    def __init__(self, cache: ApiCache = None, pokedex: Pokedex = None):
         self.session = None
         self.pokemon_map = {} 
+        self.aliases = {}      # tên Smogon -> ID PokeAPI (smogon_fetch.py tạo lúc ingest)
+        self.resolver = AliasResolver({})
+        self.cache = cache or ApiCache()
+        self.pokedex = pokedex or Pokedex()  # đọc lười ở lần tra cứu đầu tiên
+        self.sprite_urls = {}                # tên -> URL artwork đã resolve
         self.load_reference()
 
     def load_reference(self):
@@ -22,6 +67,15 @@ class PokeApiService:
                 print(f"[PokeAPI] Error loading reference file: {e}")
         else:
             print("[PokeAPI] Reference file not found.")
+        self.resolver = AliasResolver(self.pokemon_map)
+
+        if os.path.exists(ALIAS_FILE):
+            try:
+                with open(ALIAS_FILE, "r", encoding="utf-8") as f:
+                    self.aliases = json.load(f)
+                print(f"[PokeAPI] Loaded {len(self.aliases)} Smogon aliases.")
+            except Exception as e:
+                print(f"[PokeAPI] Error loading alias file: {e}")
 
     async def get_session(self):
         if self.session is None:
@@ -29,48 +83,52 @@ class PokeApiService:
         return self.session
 
     def slugify(self, name: str) -> str:
-        original = name
-        name = name.lower().strip()
-        name = name.replace(" ", "-").replace(".", "").replace(":", "").replace("'", "")
-        
-        if "megazard" in name: return "charizard" 
-        if "basculin-blue-striped" in name: return "basculin-blue-striped"
-        
-        if "ogerpon" in name and "mask" not in name:
-            if name not in self.pokemon_map:
-                name += "-mask"
-        
-        # [LOG] In ra sự thay đổi tên
-        if original != name:
-            print(f"[DEBUG-API] Slugify: '{original}' -> '{name}'")
-        return name
-
-    def get_api_url(self, slug_name: str) -> str:
-        if slug_name in self.pokemon_map:
-            p_id = self.pokemon_map[slug_name]
-            return f"{POKEAPI_URL}/pokemon/{p_id}"
-        
-        for name, p_id in self.pokemon_map.items():
-            if name.startswith(slug_name):
-                print(f"[DEBUG-API] Fuzzy Match: '{slug_name}' matches '{name}' -> ID: {p_id}")
-                return f"{POKEAPI_URL}/pokemon/{p_id}"
+        return slug_name(name)
 
-        return f"{POKEAPI_URL}/pokemon/{slug_name}"
+    def resolve_id(self, name: str):
+        """ID PokeAPI của một tên Smogon: một lần tra bảng alias; tên chưa có trong bảng thì resolve một lần rồi nhớ lại."""
+        if name in self.aliases:
+            return self.aliases[name]
+        p_id = self.aliases[name] = self.resolver.resolve(name)
+        print(f"[DEBUG-API] Alias miss: '{name}' -> ID: {p_id}")
+        return p_id
 
-    async def get_sprite(self, pokemon_name: str) -> str:
-        slug = self.slugify(pokemon_name)
-        url = self.get_api_url(slug) 
+    def get_api_url(self, name: str) -> str:
+        p_id = self.resolve_id(name)
+        return f"{POKEAPI_URL}/pokemon/{p_id if p_id is not None else self.slugify(name)}"
+
+    async def fetch_json(self, url: str):
+        """GET một endpoint qua cache trên đĩa; None nếu không tồn tại / lỗi mà chưa có bản cache."""
+        return await self.cache.get(url, lambda: self.download(url))
+
+    async def download(self, url: str):
         session = await self.get_session()
         try:
             async with session.get(url) as resp:
-                if resp.status != 200: return None
-                data = await resp.json()
-                sprites = data.get("sprites", {})
-                return (sprites.get("other", {}).get("official-artwork", {}).get("front_default") or 
-                        sprites.get("other", {}).get("home", {}).get("front_default") or
-                        sprites.get("front_default"))
-        except:
-            return None
+                if resp.status == 404: return True, None
+                if resp.status != 200:
+                    print(f"[DEBUG-API] {url} -> {resp.status}")
+                    return False, None
+                return True, slim_payload(url, await resp.json())
+        except (aiohttp.ClientError, asyncio.TimeoutError, ValueError) as e:
+            print(f"[DEBUG-API-ERROR] {url}: {e!r}")
+            return False, None
+
+    def resolve_sprite(self, name: str) -> str:
+        """URL artwork không cần mạng: lấy từ Pokédex offline, hoặc theo pattern cho ID gốc; None nếu phải hỏi API."""
+        p_id = self.resolve_id(name)
+        if p_id is None: return None
+        return self.pokedex.image_url(p_id) or (ARTWORK_URL.format(p_id) if p_id < FORM_ID_START else None)
+
+    async def get_sprite(self, pokemon_name: str) -> str:
+        url = self.sprite_urls.get(pokemon_name)
+        if url: return url
+        url = self.resolve_sprite(pokemon_name)
+        if url is None:
+            data = await self.fetch_json(self.get_api_url(pokemon_name))
+            url = artwork_url(data) if data else None
+        if url: self.sprite_urls[pokemon_name] = url
+        return url
 
     async def get_sprites_batch(self, names: list):
         tasks = [self.get_sprite(name) for name in names]
@@ -80,30 +138,26 @@ class PokeApiService:
         # [LOG]
         print(f"[DEBUG-API] get_pokemon_static_data CALLED for: '{name}'")
         slug = self.slugify(name)
-        url = self.get_api_url(slug) 
+        p_id = self.resolve_id(name)
+        if p_id is not None:
+            data = self.pokedex.pokemon(p_id)
+            if data: return data
+        url = self.get_api_url(name)
         
         print(f"[DEBUG-API] Fetching URL: {url}")
-        session = await self.get_session()
         
         try:
-            async with session.get(url) as resp:
-                print(f"[DEBUG-API] Response Code: {resp.status}")
-                if resp.status != 200: 
-                    print(f"[DEBUG-API] FAILED to get data for {slug}")
-                    return None
-                p_data = await resp.json()
+            p_data = await self.fetch_json(url)
+            if not p_data: 
+                print(f"[DEBUG-API] FAILED to get data for {slug}")
+                return None
 
             # Lấy thông tin Species (Mô tả, Loại)
             s_data = {}
             if p_data.get("species", {}).get("url"):
-                async with session.get(p_data["species"]["url"]) as resp:
-                    if resp.status == 200:
-                        s_data = await resp.json()
+                s_data = await self.fetch_json(p_data["species"]["url"]) or {}
 
-            sprites = p_data.get("sprites", {})
-            image_url = (sprites.get("other", {}).get("official-artwork", {}).get("front_default") or 
-                         sprites.get("other", {}).get("home", {}).get("front_default") or
-                         sprites.get("front_default"))
+            image_url = artwork_url(p_data)
 
             # --- [FIX QUAN TRỌNG] Lấy Description an toàn ---
             desc = "No description."
@@ -141,8 +195,8 @@ class PokeApiService:
         
     async def get_move_details(self, move_name: str):
         slug = self.slugify(move_name)
-        session = await self.get_session()
-        async with session.get(f"{POKEAPI_URL}/move/{slug}") as resp:
-            if resp.status != 200: return None
-            data = await resp.json()
+        offline = self.pokedex.move(slug)
+        if offline: return offline
+        data = await self.fetch_json(f"{POKEAPI_URL}/move/{slug}")
+        if not data: return None
         return {"type": data["type"]["name"], "category": data["damage_class"]["name"]}
\ No newline at end of file
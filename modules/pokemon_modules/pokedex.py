@@ -0,0 +1,57 @@
+import json
+import os
+
+DEX_FILE = "modules/pokemon_modules/pokedex.json"
+
+class Pokedex:
+    """
+    Dữ liệu Pokédex offline do pokemon_references.py tạo (types, stats, species, mô tả, artwork, move).
+    File chỉ được đọc ở lần tra cứu đầu tiên; không có file thì mọi tra cứu trả None
+    và PokeApiService tự gọi PokéAPI như cũ.
+    """
+
+    def __init__(self, path: str = DEX_FILE):
+        self.path = path
+        self.data = None
+
+    def load(self) -> dict:
+        if self.data is None:
+            self.data = {}
+            if os.path.exists(self.path):
+                try:
+                    with open(self.path, "r", encoding="utf-8") as f:
+                        self.data = json.load(f)
+                    print(f"[PokeAPI] Loaded Pokédex: {len(self.data.get('pokemon', {}))} pokemon, "
+                          f"{len(self.data.get('moves', {}))} moves.")
+                except (OSError, ValueError) as e:
+                    print(f"[PokeAPI] Error loading Pokédex file: {e}")
+        return self.data
+
+    def pokemon(self, p_id: int):
+        """Cùng dạng kết quả với PokeApiService.get_pokemon_static_data."""
+        data = self.load()
+        rec = data.get("pokemon", {}).get(str(p_id))
+        if rec is None: return None
+        name, types, height, weight, stats, species, image_url = rec
+        genus, desc = data.get("species", {}).get(species, ["Pokémon", "No description."])
+        return {
+            "id": int(p_id),
+            "name": name,
+            "types": list(types),
+            "height": height,
+            "weight": weight,
+            "stats": dict(zip(data["stats"], stats)),
+            "species": genus,
+            "description": desc,
+            "image_url": image_url
+        }
+
+    def move(self, slug: str):
+        """Cùng dạng kết quả với PokeApiService.get_move_details."""
+        rec = self.load().get("moves", {}).get(slug)
+        if rec is None: return None
+        return {"type": rec[0], "category": rec[1]}
+
+    def image_url(self, p_id: int):
+        rec = self.load().get("pokemon", {}).get(str(p_id))
+        return rec[6] if rec else None
@@ -0,0 +1,108 @@
+import asyncio
+import json
+import time
+from collections import OrderedDict
+
+MAX_BYTES = 32 * 1024 * 1024  # tổng kích thước (ước lượng theo JSON) tối đa của cache
+TTL = 6 * 3600                # giây; data Smogon chỉ đổi mỗi tháng
+
+class ResultCache:
+    """
+    Cache kết quả async: LRU giới hạn theo byte + TTL, và single-flight: nhiều lời gọi
+    cùng key trong lúc đang tải chỉ tạo một request, các lời gọi sau chờ chung kết quả.
+    Kết quả None (không có data / lỗi) không được cache.
+    Giá trị được dùng chung giữa các lời gọi nên phía gọi không được sửa nó.
+    """
+
+    def __init__(self, max_bytes: int = MAX_BYTES, ttl: float = TTL):
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.entries = OrderedDict()  # key -> (hết hạn lúc, size, value)
+        self.inflight = {}            # key -> asyncio.Future
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    @staticmethod
+    def estimate_size(value) -> int:
+        return len(json.dumps(value, ensure_ascii=False, separators=(",", ":")))
+
+    def get(self, key):
+        entry = self.entries.get(key)
+        if entry is None: return None
+        expires, _, value = entry
+        if expires < time.monotonic():
+            self._remove(key)
+            self.expirations += 1
+            return None
+        self.entries.move_to_end(key)
+        return value
+
+    def put(self, key, value):
+        size = self.estimate_size(value)
+        if size > self.max_bytes: return
+        if key in self.entries: self._remove(key)
+        self.entries[key] = (time.monotonic() + self.ttl, size, value)
+        self.size += size
+        while self.size > self.max_bytes:
+            oldest = next(iter(self.entries))
+            self._remove(oldest)
+            self.evictions += 1
+
+    def _remove(self, key):
+        _, size, _ = self.entries.pop(key)
+        self.size -= size
+
+    def clear(self):
+        self.entries.clear()
+        self.size = 0
+
+    async def get_or_load(self, key, loader):
+        """Trả value trong cache, hoặc gọi `loader()` (coroutine function) đúng một lần cho mọi lời gọi đồng thời."""
+        value = self.get(key)
+        if value is not None:
+            self.hits += 1
+            return value
+
+        future = self.inflight.get(key)
+        if future is not None:
+            self.coalesced += 1
+            return await asyncio.shield(future)
+
+        self.misses += 1
+        future = asyncio.get_running_loop().create_future()
+        self.inflight[key] = future
+        try:
+            value = await loader()
+        except BaseException as e:
+            future.set_exception(e)
+            future.exception()  # đánh dấu đã lấy, tránh warning khi không ai chờ
+            raise
+        else:
+            if value is not None: self.put(key, value)
+            future.set_result(value)
+            return value
+        finally:
+            self.inflight.pop(key, None)
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses + self.coalesced
+        return {
+            "entries": len(self.entries),
+            "bytes": self.size,
+            "hits": self.hits,
+            "misses": self.misses,
+            "coalesced": self.coalesced,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+            "hit_rate": (self.hits + self.coalesced) / lookups if lookups else 0.0,
+        }
+
+    def summary(self) -> str:
+        s = self.stats()
+        return (f"{s['entries']} entries, {s['bytes'] / 1024:.0f} KB, hit rate {s['hit_rate']:.0%} "
+                f"({s['hits']} hits, {s['coalesced']} coalesced, {s['misses']} misses, "
+                f"{s['evictions']} evicted, {s['expirations']} expired)")
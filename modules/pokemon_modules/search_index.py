@@ -0,0 +1,52 @@
+from bisect import bisect_left
+
+class SearchIndex:
+    """
+    Index tìm kiếm cho autocomplete trên một danh sách tên (theo thứ tự ưu tiên, vd. usage).
+    - tên đã lower sẵn
+    - mảng tên đã sort để tìm prefix bằng bisect
+    - trigram -> danh sách vị trí (tăng dần) để tìm substring mà không quét cả danh sách
+    Kết quả: các tên bắt đầu bằng query trước, sau đó các tên chứa query, mỗi nhóm theo thứ tự gốc.
+    """
+
+    def __init__(self, names: list):
+        self.names = list(names)
+        self.lowered = [n.lower() for n in self.names]
+        self.sorted_keys = sorted((low, i) for i, low in enumerate(self.lowered))
+        self.trigrams = {}
+        for i, low in enumerate(self.lowered):
+            for gram in {low[k:k + 3] for k in range(len(low) - 2)}:
+                self.trigrams.setdefault(gram, []).append(i)
+
+    def __len__(self):
+        return len(self.names)
+
+    def _prefix_matches(self, q: str) -> list:
+        out = []
+        pos = bisect_left(self.sorted_keys, (q, -1))
+        while pos < len(self.sorted_keys) and self.sorted_keys[pos][0].startswith(q):
+            out.append(self.sorted_keys[pos][1])
+            pos += 1
+        out.sort()
+        return out
+
+    def _substring_candidates(self, q: str):
+        if len(q) < 3:
+            return range(len(self.lowered))
+        # Chỉ cần xét các tên chứa trigram hiếm nhất của query
+        postings = [self.trigrams.get(q[k:k + 3]) for k in range(len(q) - 2)]
+        if not all(postings): return []
+        return min(postings, key=len)
+
+    def search(self, query: str, limit: int = 25) -> list:
+        q = query.lower().strip()
+        if not q: return self.names[:limit]
+
+        ranks = self._prefix_matches(q)[:limit]
+        if len(ranks) < limit:
+            seen = set(ranks)
+            for i in self._substring_candidates(q):
+                if i not in seen and q in self.lowered[i]:
+                    ranks.append(i)
+                    if len(ranks) >= limit: break
+        return [self.names[i] for i in ranks]
@@ -0,0 +1,34 @@
+"""
+Lớp lưu trữ dùng chung cho các cog và PokemonService (cây JSON kiểu Firebase Realtime Database).
+
+Backend chọn bằng biến môi trường:
+    STORAGE_BACKEND=firebase (mặc định, FIREBASE_URL) | sqlite (STORAGE_SQLITE_FILE) | memory
+Cog nhận storage qua constructor; setup() mặc định dùng get_storage() (một instance cho cả bot).
+"""
+import os
+from .base import LocalStorage, LocalView, MemoryStorage, Storage, join_path, sanitize_key, shallow_value
+from .mirror import FirebaseMirror, prune, split_path
+
+STORAGE_BACKENDS = ("firebase", "sqlite", "memory")
+
+def create_storage(backend: str = None, **kwargs) -> Storage:
+    backend = (backend or os.getenv("STORAGE_BACKEND", "firebase")).lower()
+    if backend == "firebase":
+        from .firebase import FirebaseStorage
+        return FirebaseStorage(**kwargs)
+    if backend == "sqlite":
+        from .sqlite import SQLiteStorage, SQLITE_FILE
+        return SQLiteStorage(kwargs.get("path") or os.getenv("STORAGE_SQLITE_FILE", SQLITE_FILE))
+    if backend == "memory":
+        return MemoryStorage(**kwargs)
+    raise ValueError(f"Unknown STORAGE_BACKEND {backend!r} (expected one of {', '.join(STORAGE_BACKENDS)})")
+
+_default_storage = None
+
+def get_storage() -> Storage:
+    """Storage mặc định của bot (tạo lần đầu cần đến, dùng chung cho mọi cog)."""
+    global _default_storage
+    if _default_storage is None:
+        _default_storage = create_storage()
+        print(f"[STORAGE] Backend: {_default_storage.name}")
+    return _default_storage
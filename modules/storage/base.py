@@ -0,0 +1,163 @@
+import asyncio
+import copy
+import threading
+from .mirror import FirebaseMirror, split_path
+
+def sanitize_key(key: str) -> str:
+    """
+    Firebase không cho phép các ký tự: . $ # [ ] / hoặc ký tự điều khiển ASCII 0-31 or 127.
+    Trong Pokemon data, phổ biến nhất là dấu chấm (.) trong 'Mr. Mime', 'Mime Jr.'
+    Dùng chung cho upload_firebase.py (key khi ghi) và bảng alias (tên bot nhận được khi tra cứu).
+    """
+    # Thay thế dấu chấm bằng chuỗi rỗng (Mr. Mime -> Mr Mime) hoặc ký tự khác
+    return key.replace(".", "").replace("#", "").replace("$", "").replace("[", "").replace("]", "").replace("/", "")
+
+def join_path(*parts) -> str:
+    return "/".join(str(p).strip("/") for p in parts if str(p).strip("/"))
+
+def shallow_value(value):
+    """Kết quả kiểu shallow=true của Firebase: node con là object/mảng chỉ còn true."""
+    if isinstance(value, list):
+        value = {str(i): v for i, v in enumerate(value) if v is not None}
+    if not isinstance(value, dict): return value
+    return {k: True if isinstance(v, (dict, list)) else v for k, v in value.items()}
+
+class Storage:
+    """
+    Giao diện lưu trữ dạng cây JSON theo ngữ nghĩa Firebase Realtime Database
+    (path "a/b/c", put ghi đè node, patch ghi từng key con / nhiều path, null = xoá).
+    Mọi thao tác là async; lỗi mạng / IO thì get trả None, thao tác ghi trả False.
+    """
+    name = "storage"
+
+    async def get(self, path: str = "", shallow: bool = False):
+        raise NotImplementedError
+
+    async def keys(self, path: str = "") -> list:
+        data = await self.get(path, shallow=True)
+        return list(data) if isinstance(data, dict) else []
+
+    async def put(self, path: str, value) -> bool:
+        raise NotImplementedError
+
+    async def patch(self, path: str, values: dict) -> bool:
+        raise NotImplementedError
+
+    async def delete(self, path: str) -> bool:
+        return await self.put(path, None)
+
+    def watch(self, path: str, on_change=None):
+        """
+        Theo dõi một node: trả object có `.ready` và `.get(*segments)` (đọc đồng bộ, không I/O mạng);
+        `on_change(event, path tương đối, data)` được gọi sau mỗi thay đổi. Phải gọi trong event loop.
+        """
+        raise NotImplementedError
+
+    async def close(self) -> None:
+        pass
+
+class LocalView:
+    """Kết quả watch() của backend cục bộ: đọc thẳng từ storage nên luôn sẵn sàng."""
+    ready = True
+
+    def __init__(self, storage, parts: list):
+        self.storage = storage
+        self.parts = parts
+
+    def get(self, *path):
+        return self.storage.read(self.parts + split_path(join_path(*path)))
+
+class LocalStorage(Storage):
+    """
+    Phần chung của backend trong process (memory / SQLite): read / write đồng bộ có khoá
+    (script upload gọi thẳng từ nhiều thread), watch() nhận event của chính các lần ghi này.
+    """
+
+    offload = False
+
+    def __init__(self):
+        self.lock = threading.RLock()
+        self.listeners = []  # [(path parts, on_change)]
+
+    # --- đồng bộ ---
+    def read(self, parts: list):
+        raise NotImplementedError
+
+    def write(self, parts: list, value) -> None:
+        raise NotImplementedError
+
+    def read_shallow(self, parts: list):
+        return shallow_value(self.read(parts))
+
+    def apply(self, event: str, path: str, data) -> None:
+        """Ghi kiểu event stream: put (ghi đè node) hoặc patch ({key hoặc "a/b": giá trị})."""
+        parts = split_path(path)
+        self._write_event(event, parts, data)
+        self.notify(event, parts, data)
+
+    def _write_event(self, event: str, parts: list, data) -> None:
+        with self.lock:
+            if event == "put":
+                self.write(parts, data)
+            else:
+                for key, value in data.items():
+                    self.write(parts + split_path(key), value)
+
+    def notify(self, event: str, parts: list, data) -> None:
+        for sub, on_change in self.listeners:
+            if not on_change: continue
+            if parts[:len(sub)] == sub:
+                on_change(event, "/" + "/".join(parts[len(sub):]), data)
+            elif sub[:len(parts)] == parts:
+                on_change("put", "/", self.read(sub))
+
+    # --- async (Storage) ---
+    async def _call(self, fn, *args):
+        # Backend có I/O đĩa chạy trong thread để không chặn event loop
+        return await asyncio.to_thread(fn, *args) if self.offload else fn(*args)
+
+    async def get(self, path: str = "", shallow: bool = False):
+        return await self._call(self.read_shallow if shallow else self.read, split_path(path))
+
+    async def put(self, path: str, value) -> bool:
+        return await self._apply_async("put", path, value)
+
+    async def patch(self, path: str, values: dict) -> bool:
+        return await self._apply_async("patch", path, values)
+
+    async def _apply_async(self, event: str, path: str, data) -> bool:
+        parts = split_path(path)
+        try:
+            await self._call(self._write_event, event, parts, data)
+        except Exception as e:
+            print(f"[STORAGE-ERR] {self.name} {event} {path}: {e!r}")
+            return False
+        self.notify(event, parts, data)
+        return True
+
+    def watch(self, path: str, on_change=None):
+        parts = split_path(path)
+        self.listeners.append((parts, on_change))
+        return LocalView(self, parts)
+
+class MemoryStorage(LocalStorage):
+    """Toàn bộ dữ liệu trong RAM (benchmark, test, chạy bot không cần database)."""
+    name = "memory"
+
+    def __init__(self, data=None):
+        super().__init__()
+        self.tree = FirebaseMirror()
+        self.tree.data = data
+
+    def read(self, parts: list):
+        with self.lock:
+            # Bản sao: caller sửa kết quả không làm hỏng dữ liệu gốc (giống đọc từ mạng)
+            return copy.deepcopy(self.tree.get(*parts))
+
+    def read_shallow(self, parts: list):
+        with self.lock:
+            return shallow_value(self.tree.get(*parts))
+
+    def write(self, parts: list, value) -> None:
+        with self.lock:
+            self.tree.set_path(parts, copy.deepcopy(value))
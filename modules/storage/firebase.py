@@ -0,0 +1,60 @@
+import copy
+from .base import Storage, shallow_value
+from .firebase_client import FirebaseClient, FIREBASE_ROOT
+from .firebase_stream import FirebaseStream
+from .mirror import split_path
+
+class FirebaseStorage(Storage):
+    """
+    Firebase Realtime Database qua REST (FirebaseClient). Node đã watch() được giữ đồng bộ bằng
+    REST streaming: khi stream sẵn sàng, get() bên dưới node đó đọc từ bản sao cục bộ
+    thay vì GET, và các lần ghi thành công được áp dụng ngay vào bản sao.
+    """
+    name = "firebase"
+
+    def __init__(self, base_url: str = FIREBASE_ROOT, client: FirebaseClient = None):
+        self.client = client or FirebaseClient(base_url)
+        self.base_url = self.client.base_url
+        self.streams = []  # [(path parts, FirebaseStream)]
+
+    def _mirrors(self, parts: list):
+        for root, stream in self.streams:
+            if parts[:len(root)] == root:
+                yield stream.mirror, parts[len(root):]
+
+    async def get(self, path: str = "", shallow: bool = False):
+        parts = split_path(path)
+        for mirror, rel in self._mirrors(parts):
+            if mirror.ready:
+                value = copy.deepcopy(mirror.get(*rel))
+                return shallow_value(value) if shallow else value
+        return await self.client.get(*parts, shallow=shallow)
+
+    async def _write(self, method: str, event: str, path: str, data) -> bool:
+        parts = split_path(path)
+        ok = await self.client.write(method, *parts, value=data)
+        if ok:
+            # Không đợi event từ stream quay về
+            for mirror, rel in self._mirrors(parts):
+                mirror.apply(event, "/".join(rel), copy.deepcopy(data))
+        return ok
+
+    async def put(self, path: str, value) -> bool:
+        return await self._write("PUT", "put", path, value)
+
+    async def patch(self, path: str, values: dict) -> bool:
+        return await self._write("PATCH", "patch", path, values)
+
+    async def delete(self, path: str) -> bool:
+        return await self._write("DELETE", "put", path, None)
+
+    def watch(self, path: str, on_change=None):
+        stream = FirebaseStream(path, on_change, base_url=self.base_url)
+        self.streams.append((split_path(path), stream))
+        stream.start()
+        return stream.mirror
+
+    async def close(self) -> None:
+        for _, stream in self.streams:
+            await stream.stop()
+        await self.client.close()
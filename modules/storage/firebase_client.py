@@ -0,0 +1,72 @@
+import aiohttp
+import asyncio
+import json
+import os
+from urllib.parse import quote
+
+# Đặt FIREBASE_URL (vd. http://127.0.0.1:9000 của firebase_emulator.py) để chạy với database khác
+FIREBASE_ROOT = os.getenv("FIREBASE_URL", "https://vo-robin-default-rtdb.asia-southeast1.firebasedatabase.app")
+MAX_CONCURRENCY = 20  # số request tới Firebase cùng lúc tối đa (toàn bot)
+TIMEOUT = aiohttp.ClientTimeout(total=10, connect=5)
+
+class FirebaseClient:
+    """
+    Client REST tối giản cho Firebase Realtime Database trên asyncio.
+    Một ClientSession (một pool kết nối) dùng chung; semaphore giới hạn số request đồng thời
+    nên fan-out lớn (build cache, tính trung bình) chỉ xếp hàng chứ không tràn kết nối.
+    """
+
+    def __init__(self, base_url: str = FIREBASE_ROOT, max_concurrency: int = MAX_CONCURRENCY,
+                 timeout: aiohttp.ClientTimeout = TIMEOUT):
+        self.base_url = base_url.rstrip("/")
+        self.max_concurrency = max_concurrency
+        self.timeout = timeout
+        self.semaphore = asyncio.Semaphore(max_concurrency)
+        self.session = None
+
+    async def get_session(self) -> aiohttp.ClientSession:
+        if self.session is None or self.session.closed:
+            connector = aiohttp.TCPConnector(limit=self.max_concurrency, ttl_dns_cache=300)
+            self.session = aiohttp.ClientSession(connector=connector, timeout=self.timeout)
+        return self.session
+
+    def url(self, *path: str) -> str:
+        segments = "/".join(quote(str(p), safe="") for p in path if p != "")
+        return f"{self.base_url}/{segments}.json"
+
+    async def get(self, *path: str, shallow: bool = False):
+        """GET một node; trả JSON đã decode hoặc None nếu lỗi / không tồn tại."""
+        url = self.url(*path)
+        params = {"shallow": "true"} if shallow else None
+        session = await self.get_session()
+        async with self.semaphore:
+            try:
+                async with session.get(url, params=params) as resp:
+                    if resp.status != 200:
+                        print(f"[FIREBASE-ERR] GET {url} -> {resp.status}")
+                        return None
+                    return await resp.json(content_type=None)
+            except (aiohttp.ClientError, asyncio.TimeoutError, ValueError) as e:
+                print(f"[FIREBASE-ERR] Fetch fail {url}: {e!r}")
+                return None
+
+    async def write(self, method: str, *path: str, value=None) -> bool:
+        """PUT / PATCH / DELETE một node (print=silent: Firebase không gửi lại body)."""
+        url = self.url(*path)
+        body = None if method == "DELETE" else json.dumps(value, ensure_ascii=False, separators=(",", ":"))
+        session = await self.get_session()
+        async with self.semaphore:
+            try:
+                async with session.request(method, url, data=body, params={"print": "silent"},
+                                           headers={"Content-Type": "application/json"}) as resp:
+                    if resp.status not in (200, 204):
+                        print(f"[FIREBASE-ERR] {method} {url} -> {resp.status}")
+                        return False
+                    return True
+            except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                print(f"[FIREBASE-ERR] {method} fail {url}: {e!r}")
+                return False
+
+    async def close(self):
+        if self.session and not self.session.closed:
+            await self.session.close()
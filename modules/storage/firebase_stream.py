@@ -0,0 +1,90 @@
+import aiohttp
+import asyncio
+import json
+from urllib.parse import quote
+from .firebase_client import FIREBASE_ROOT
+from .mirror import FirebaseMirror, split_path
+
+RECONNECT_BASE = 1.0   # giây, nhân đôi sau mỗi lần kết nối lỗi liên tiếp
+RECONNECT_MAX = 60.0
+# Firebase gửi keep-alive mỗi ~30s; quá lâu không nhận được gì coi như kết nối đã chết
+READ_TIMEOUT = aiohttp.ClientTimeout(total=None, connect=10, sock_read=90)
+
+class FirebaseStream:
+    """
+    Nghe REST streaming (text/event-stream) của một path và giữ `mirror` luôn đồng bộ.
+    Event đầu tiên sau mỗi lần kết nối là put "/" chứa toàn bộ node, nên mất kết nối rồi
+    nối lại cũng tự đồng bộ lại. `on_change(event, path, data)` được gọi sau khi áp dụng.
+    """
+
+    def __init__(self, path: str, on_change=None, base_url: str = FIREBASE_ROOT):
+        self.path = path
+        self.url = f"{base_url.rstrip('/')}/{'/'.join(quote(p, safe='') for p in split_path(path))}.json"
+        self.on_change = on_change
+        self.mirror = FirebaseMirror()
+        self.task = None
+
+    def start(self):
+        if self.task is None or self.task.done():
+            self.task = asyncio.get_running_loop().create_task(self.run())
+        return self.task
+
+    async def stop(self):
+        if self.task:
+            self.task.cancel()
+            try: await self.task
+            except asyncio.CancelledError: pass
+
+    async def run(self):
+        attempt = 0
+        while True:
+            try:
+                async with aiohttp.ClientSession(timeout=READ_TIMEOUT) as session:
+                    async with session.get(self.url, headers={"Accept": "text/event-stream"}) as resp:
+                        if resp.status != 200:
+                            raise aiohttp.ClientResponseError(resp.request_info, (), status=resp.status)
+                        print(f"[FIREBASE-STREAM] Listening {self.path}")
+                        attempt = 0
+                        if await self._consume(resp) == "cancel":
+                            print(f"[FIREBASE-STREAM] {self.path}: cancelled by server (rules?), stop.")
+                            return
+            except (aiohttp.ClientError, asyncio.TimeoutError, ValueError) as e:
+                print(f"[FIREBASE-STREAM] {self.path}: {e!r}")
+            delay = min(RECONNECT_MAX, RECONNECT_BASE * (2 ** attempt))
+            attempt += 1
+            print(f"[FIREBASE-STREAM] {self.path}: reconnecting in {delay:.0f}s...")
+            await asyncio.sleep(delay)
+
+    async def _consume(self, resp):
+        """Đọc từng event SSE; trả tên event khiến stream kết thúc (cancel / auth_revoked) hoặc None."""
+        pending = []
+        event, data_lines = None, []
+        # Tự tách dòng: event đầu tiên (cả node) có thể dài hơn giới hạn readline của aiohttp
+        async for chunk in resp.content.iter_any():
+            pending.append(chunk)
+            if b"\n" not in chunk: continue
+            *lines, rest = b"".join(pending).split(b"\n")
+            pending = [rest]
+            for raw in lines:
+                line = raw.rstrip(b"\r").decode("utf-8")
+                if line:
+                    field, _, value = line.partition(":")
+                    if value.startswith(" "): value = value[1:]
+                    if field == "event": event = value
+                    elif field == "data": data_lines.append(value)
+                    continue
+                if event in ("cancel", "auth_revoked"): return event
+                if event in ("put", "patch"):
+                    payload = json.loads("\n".join(data_lines))
+                    self._dispatch(event, payload.get("path", "/"), payload.get("data"))
+                event, data_lines = None, []
+        return None
+
+    def _dispatch(self, event: str, path: str, data) -> None:
+        self.mirror.apply(event, path, data)
+        self.mirror.ready = True
+        if self.on_change:
+            try:
+                self.on_change(event, path, data)
+            except Exception as e:
+                print(f"[FIREBASE-STREAM] {self.path}: handler error {e!r}")
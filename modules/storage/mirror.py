@@ -0,0 +1,81 @@
+"""
+Bản sao cục bộ của cây JSON theo ngữ nghĩa Firebase Realtime Database (put / patch / null = xoá).
+Dùng chung cho MemoryStorage, SQLiteStorage, FirebaseStream và firebase_emulator.py; không import aiohttp.
+"""
+
+def split_path(path: str) -> list:
+    return [p for p in path.split("/") if p]
+
+def prune(value):
+    """Như Firebase: bỏ key có giá trị null và object rỗng (object rỗng -> None)."""
+    if not isinstance(value, dict): return value
+    out = {}
+    for k, v in value.items():
+        v = prune(v)
+        if v is not None: out[k] = v
+    return out or None
+
+class FirebaseMirror:
+    """
+    Bản sao cục bộ của một node Realtime Database, cập nhật bằng các event put / patch
+    (cùng ngữ nghĩa với REST API: put ghi đè node tại path, patch ghi đè từng key con,
+    giá trị null xoá node và node cha rỗng cũng biến mất).
+    """
+
+    def __init__(self):
+        self.data = None
+        self.ready = False  # đã nhận snapshot đầu tiên từ stream
+
+    def get(self, *path):
+        node = self.data
+        for p in path:
+            if isinstance(node, list):
+                p = int(p) if str(p).isdigit() else p
+                node = node[p] if isinstance(p, int) and p < len(node) else None
+            elif isinstance(node, dict):
+                node = node.get(str(p))
+            else:
+                return None
+        return node
+
+    def apply(self, event: str, path: str, data) -> None:
+        parts = split_path(path)
+        if event == "put":
+            self.set_path(parts, data)
+        elif event == "patch":
+            for key, value in (data or {}).items():
+                self.set_path(parts + split_path(key), value)
+
+    def set_path(self, parts: list, value) -> None:
+        value = prune(value)
+        if not parts:
+            self.data = value
+            return
+        if not isinstance(self.data, dict):
+            if value is None: return
+            self.data = self._as_dict(self.data)
+        stack = [self.data]
+        for p in parts[:-1]:
+            node = stack[-1]
+            child = node.get(p)
+            if not isinstance(child, dict):
+                if value is None: return
+                child = node[p] = self._as_dict(child)
+            stack.append(child)
+
+        if value is not None:
+            stack[-1][parts[-1]] = value
+            return
+        stack[-1].pop(parts[-1], None)
+        # Firebase không giữ node rỗng
+        for depth in range(len(stack) - 1, 0, -1):
+            if stack[depth]: break
+            stack[depth - 1].pop(parts[depth - 1], None)
+        if not self.data: self.data = None
+
+    @staticmethod
+    def _as_dict(node) -> dict:
+        # Mảng JSON của Firebase thực chất là object key "0", "1", ...
+        if isinstance(node, list):
+            return {str(i): v for i, v in enumerate(node) if v is not None}
+        return {}
@@ -0,0 +1,130 @@
+import json
+import sqlite3
+from .base import LocalStorage, shallow_value
+from .mirror import FirebaseMirror
+
+SQLITE_FILE = "bot_data.sqlite3"
+# Path lưu với ký tự phân cách \x01 (key Firebase không được chứa ký tự điều khiển) để cây con
+# của một node luôn liền nhau khi sort: "a" < "a\x01..." < "a\x02" <= mọi key anh em "a-x", "a0"...
+SEP = "\x01"
+END = "\x02"
+
+class SQLiteStorage(LocalStorage):
+    """
+    Cây JSON trong một file SQLite: mỗi giá trị lá (số, chuỗi, mảng) là một dòng (path, JSON),
+    object được tách thành các dòng con. Đọc một node = một range scan trên primary key;
+    shallow chỉ nhảy qua từng node con (mỗi con một lần seek) thay vì đọc cả cây con.
+    Mảng được lưu nguyên khối như một giá trị lá.
+    """
+    name = "sqlite"
+    offload = True
+
+    def __init__(self, path: str = SQLITE_FILE):
+        super().__init__()
+        self.path = path
+        self.conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.execute("CREATE TABLE IF NOT EXISTS nodes (path TEXT PRIMARY KEY, value TEXT NOT NULL) WITHOUT ROWID")
+
+    @staticmethod
+    def _flatten(prefix: str, value, out: list) -> list:
+        if isinstance(value, dict):
+            for k, v in value.items():
+                if v is not None:
+                    SQLiteStorage._flatten(f"{prefix}{SEP}{k}" if prefix else str(k), v, out)
+        elif value is not None:
+            out.append((prefix, json.dumps(value, ensure_ascii=False, separators=(",", ":"))))
+        return out
+
+    def _range(self, key: str):
+        """Điều kiện SQL + tham số cho các dòng thuộc cây con của `key` ("" = cả database)."""
+        if not key: return "1", ()
+        return "(path = ? OR (path > ? AND path < ?))", (key, key + SEP, key + END)
+
+    def read(self, parts: list):
+        key = SEP.join(parts)
+        where, params = self._range(key)
+        with self.lock:
+            rows = self.conn.execute(f"SELECT path, value FROM nodes WHERE {where} ORDER BY path", params).fetchall()
+        if not rows: return self._inside_leaf(parts)
+        if rows[0][0] == key: return json.loads(rows[0][1])
+
+        root = {}
+        skip = len(key) + 1 if key else 0
+        for path, value in rows:
+            node = root
+            *parents, leaf = path[skip:].split(SEP)
+            for p in parents:
+                node = node.setdefault(p, {})
+            node[leaf] = json.loads(value)
+        return root
+
+    def _inside_leaf(self, parts: list):
+        """Path nằm bên trong một mảng lưu nguyên khối (vd. ".../Moves/0")."""
+        ancestors = [SEP.join(parts[:i]) for i in range(len(parts))]
+        if not ancestors: return None
+        with self.lock:
+            row = self.conn.execute(f"SELECT path, value FROM nodes WHERE path IN ({','.join('?' * len(ancestors))}) "
+                                    "ORDER BY length(path) DESC LIMIT 1", ancestors).fetchone()
+        if not row: return None
+        mirror = FirebaseMirror()
+        mirror.data = json.loads(row[1])
+        return mirror.get(*parts[row[0].count(SEP) + 1 if row[0] else 0:])
+
+    def read_shallow(self, parts: list):
+        key = SEP.join(parts)
+        with self.lock:
+            row = self.conn.execute("SELECT value FROM nodes WHERE path = ?", (key,)).fetchone()
+            if row: return shallow_value(json.loads(row[0]))
+            base = key + SEP if key else ""
+            hi = key + END if key else None
+            out = {}
+            cur = base
+            while True:
+                if hi is None:
+                    row = self.conn.execute("SELECT path, value FROM nodes WHERE path >= ? ORDER BY path LIMIT 1", (cur,)).fetchone()
+                else:
+                    row = self.conn.execute("SELECT path, value FROM nodes WHERE path >= ? AND path < ? ORDER BY path LIMIT 1", (cur, hi)).fetchone()
+                if not row: break
+                child, sep, _ = row[0][len(base):].partition(SEP)
+                if sep: out[child] = True
+                else:
+                    value = json.loads(row[1])
+                    out[child] = True if isinstance(value, list) else value
+                cur = base + child + END
+        return out or shallow_value(self._inside_leaf(parts))
+
+    def write(self, parts: list, value) -> None:
+        key = SEP.join(parts)
+        rows = self._flatten(key, value, [])
+        where, params = self._range(key)
+        ancestors = [SEP.join(parts[:i]) for i in range(len(parts))]
+        with self.lock:
+            self.conn.execute("BEGIN")
+            try:
+                self.conn.execute(f"DELETE FROM nodes WHERE {where}", params)
+                leaf = None
+                if ancestors:
+                    leaf = self.conn.execute(f"SELECT path, value FROM nodes WHERE path IN ({','.join('?' * len(ancestors))})",
+                                             ancestors).fetchone()
+                if leaf:
+                    # Ghi vào bên trong một giá trị lá: mảng thành object {index: phần tử} (như Firebase),
+                    # giá trị đơn bị thay bằng object
+                    mirror = FirebaseMirror()
+                    mirror.data = json.loads(leaf[1])
+                    mirror.set_path(parts[leaf[0].count(SEP) + 1 if leaf[0] else 0:], value)
+                    self.conn.execute("DELETE FROM nodes WHERE path = ?", (leaf[0],))
+                    rows = self._flatten(leaf[0], mirror.data, [])
+                self.conn.executemany("INSERT INTO nodes (path, value) VALUES (?, ?)", rows)
+                self.conn.execute("COMMIT")
+            except BaseException:
+                self.conn.execute("ROLLBACK")
+                raise
+
+    def close_sync(self) -> None:
+        with self.lock:
+            self.conn.close()
+
+    async def close(self) -> None:
+        self.close_sync()
@@ -1,60 +1,158 @@
-import requests
+import argparse
 import json
 import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+import requests
 
-# Cấu hình đường dẫn
-OUTPUT_DIR = "pokemon_modules"
-OUTPUT_FILE = os.path.join(OUTPUT_DIR, "pokemon_name.json")
+# Cấu hình đường dẫn (cùng chỗ poke_api.py đọc, tính từ thư mục chứa script)
+OUTPUT_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "modules", "pokemon_modules")
+NAME_FILE = "pokemon_name.json"
+DEX_FILE = "pokedex.json"
 
+POKEAPI_URL = "https://pokeapi.co/api/v2"
 # URL lấy toàn bộ danh sách (limit cao để lấy 1 lần cho nhanh)
-POKEAPI_LIST_URL = "https://pokeapi.co/api/v2/pokemon?limit=100000&offset=0"
+POKEAPI_LIST_URL = f"{POKEAPI_URL}/pokemon?limit=100000&offset=0"
+MOVE_LIST_URL = f"{POKEAPI_URL}/move?limit=100000&offset=0"
+
+CONCURRENCY = 16
+MAX_RETRIES = 3
+TIMEOUT = 30
+STAT_NAMES = ["hp", "attack", "defense", "special-attack", "special-defense", "speed"]
+
+_thread_local = threading.local()
+
+def get_session() -> requests.Session:
+    """Mỗi thread giữ một Session riêng để tái sử dụng kết nối keep-alive."""
+    session = getattr(_thread_local, "session", None)
+    if session is None:
+        session = _thread_local.session = requests.Session()
+    return session
+
+def get_json(url: str):
+    """GET JSON có retry; None nếu 404 hoặc thất bại hẳn."""
+    for attempt in range(MAX_RETRIES + 1):
+        try:
+            r = get_session().get(url, timeout=TIMEOUT)
+            if r.status_code == 404: return None
+            r.raise_for_status()
+            return r.json()
+        except (requests.RequestException, ValueError) as e:
+            if attempt == MAX_RETRIES:
+                print(f"❌ Không tải được {url}: {e}")
+                return None
+            time.sleep(2 ** attempt)
+
+def url_id(url: str) -> int:
+    # URL có dạng: https://pokeapi.co/api/v2/pokemon/132/ -> lấy phần tử kế cuối
+    return int(url.rstrip("/").split("/")[-1])
+
+def english(entries: list, field: str, default: str) -> str:
+    for entry in entries or []:
+        if entry.get("language", {}).get("name") == "en":
+            return entry.get(field, default)
+    return default
+
+def pokemon_record(p_data: dict) -> list:
+    """[name, types, height, weight, stats theo STAT_NAMES, species, image_url] (giống get_pokemon_static_data)."""
+    sprites = p_data.get("sprites", {})
+    image_url = (sprites.get("other", {}).get("official-artwork", {}).get("front_default") or
+                 sprites.get("other", {}).get("home", {}).get("front_default") or
+                 sprites.get("front_default"))
+    stats = {s["stat"]["name"]: s["base_stat"] for s in p_data["stats"]}
+    return [
+        p_data["name"],
+        [t["type"]["name"] for t in p_data["types"]],
+        p_data["height"] / 10,
+        p_data["weight"] / 10,
+        [stats.get(s, 0) for s in STAT_NAMES],
+        p_data.get("species", {}).get("name"),
+        image_url,
+    ]
 
-def create_reference_file():
+def species_record(s_data: dict) -> list:
+    """[genus, description] tiếng Anh (giống get_pokemon_static_data)."""
+    desc = english(s_data.get("flavor_text_entries"), "flavor_text", "No description.")
+    return [english(s_data.get("genera"), "genus", "Pokémon"), desc.replace("\n", " ").replace("\f", " ")]
+
+def move_record(m_data: dict) -> list:
+    """[type, category] (giống get_move_details)."""
+    return [m_data["type"]["name"], (m_data.get("damage_class") or {}).get("name")]
+
+def fetch_all(urls: dict, build, concurrency: int, label: str) -> dict:
+    """Tải song song {key: url} -> {key: build(json)}; bỏ các key tải lỗi."""
+    out = {}
+    with ThreadPoolExecutor(max_workers=max(1, concurrency)) as executor:
+        futures = {executor.submit(get_json, url): key for key, url in urls.items()}
+        for done, future in enumerate(as_completed(futures), 1):
+            data = future.result()
+            if data is not None:
+                out[futures[future]] = build(data)
+            if done % 200 == 0 or done == len(futures):
+                print(f"   {label}: {done}/{len(futures)}")
+    return out
+
+def create_reference_file(output_dir: str = OUTPUT_DIR, concurrency: int = CONCURRENCY, with_dex: bool = True):
     # 1. Tạo thư mục nếu chưa có
-    if not os.path.exists(OUTPUT_DIR):
-        os.makedirs(OUTPUT_DIR)
-        print(f"📁 Đã tạo thư mục {OUTPUT_DIR}")
+    if not os.path.exists(output_dir):
+        os.makedirs(output_dir)
+        print(f"📁 Đã tạo thư mục {output_dir}")
 
     print("🔄 Đang tải danh sách toàn bộ Pokemon từ PokéAPI...")
-    
-    try:
-        # 2. Gọi API
-        response = requests.get(POKEAPI_LIST_URL, timeout=30)
-        if response.status_code != 200:
-            print(f"❌ Lỗi API: {response.status_code}")
-            return
-
-        data = response.json()
-        results = data.get("results", [])
-        
-        # 3. Xử lý dữ liệu: Name -> ID
-        pokemon_map = {}
-        
-        print(f"📥 Đã nhận {len(results)} pokemon. Đang xử lý...")
-
-        for item in results:
-            name = item['name']
-            url = item['url']
-            
-            # URL có dạng: https://pokeapi.co/api/v2/pokemon/132/
-            # Cắt chuỗi để lấy ID ở cuối
-            try:
-                # split('/') -> ['', 'api', 'v2', 'pokemon', '132', '']
-                # Lấy phần tử kế cuối
-                p_id = int(url.split('/')[-2])
-                pokemon_map[name] = p_id
-            except:
-                continue
-
-        # 4. Ghi ra file JSON
-        with open(OUTPUT_FILE, "w", encoding="utf-8") as f:
-            json.dump(pokemon_map, f, indent=4)
-            
-        print(f"✅ THÀNH CÔNG! Đã lưu {len(pokemon_map)} pokemon vào '{OUTPUT_FILE}'")
-        print("💡 Bây giờ bạn có thể dùng file này để lookup ID.")
-
-    except Exception as e:
-        print(f"❌ Có lỗi xảy ra: {e}")
+    listing = get_json(POKEAPI_LIST_URL)
+    if not listing:
+        print("❌ Không tải được danh sách Pokemon")
+        return
+
+    # 2. Name -> ID
+    pokemon_map = {}
+    for item in listing.get("results", []):
+        try:
+            pokemon_map[item["name"]] = url_id(item["url"])
+        except (KeyError, ValueError):
+            continue
+
+    name_file = os.path.join(output_dir, NAME_FILE)
+    with open(name_file, "w", encoding="utf-8") as f:
+        json.dump(pokemon_map, f, indent=4)
+    print(f"✅ Đã lưu {len(pokemon_map)} pokemon vào '{name_file}'")
+    if not with_dex: return
+
+    # 3. Dữ liệu Pokédex: /pokemon/{id}, species (nhiều form dùng chung một species) và /move/{id}
+    started = time.perf_counter()
+    pokemon = fetch_all({p_id: f"{POKEAPI_URL}/pokemon/{p_id}" for p_id in pokemon_map.values()},
+                        pokemon_record, concurrency, "pokemon")
+    species_names = {rec[5] for rec in pokemon.values() if rec[5]}
+    species = fetch_all({name: f"{POKEAPI_URL}/pokemon-species/{name}" for name in species_names},
+                        species_record, concurrency, "species")
+
+    moves_listing = get_json(MOVE_LIST_URL) or {}
+    moves = fetch_all({item["name"]: item["url"] for item in moves_listing.get("results", [])},
+                      move_record, concurrency, "moves")
+
+    dex = {
+        "stats": STAT_NAMES,
+        "pokemon": {str(p_id): pokemon[p_id] for p_id in sorted(pokemon)},
+        "species": dict(sorted(species.items())),
+        "moves": dict(sorted(moves.items())),
+    }
+    dex_file = os.path.join(output_dir, DEX_FILE)
+    with open(dex_file, "w", encoding="utf-8") as f:
+        json.dump(dex, f, ensure_ascii=False, separators=(",", ":"))
+    print(f"✅ Đã lưu {len(pokemon)} pokemon, {len(species)} species, {len(moves)} move vào '{dex_file}' "
+          f"({os.path.getsize(dex_file) // 1024} KB, {time.perf_counter() - started:.1f}s)")
+    print("💡 Bot đọc file này thay vì gọi PokéAPI khi tra cứu.")
+
+def main():
+    parser = argparse.ArgumentParser(description="Tạo file tham chiếu Pokemon (name -> ID) và dữ liệu Pokédex offline.")
+    parser.add_argument("--output-dir", default=OUTPUT_DIR)
+    parser.add_argument("--concurrency", type=int, default=CONCURRENCY,
+                        help=f"Số request PokéAPI song song (mặc định {CONCURRENCY})")
+    parser.add_argument("--names-only", action="store_true", help="Chỉ tạo pokemon_name.json")
+    args = parser.parse_args()
+    create_reference_file(args.output_dir, args.concurrency, not args.names_only)
 
 if __name__ == "__main__":
-    create_reference_file()
\ No newline at end of file
+    main()
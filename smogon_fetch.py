@@ -1,208 +1,879 @@
+import argparse
+import codecs
+import hashlib
+import itertools
 import json
+import os
+import random
 import re
-from typing import Any, Dict, List, Optional, Tuple
+import threading
+import time
+import zlib
+from concurrent.futures import Future, ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Tuple, TypeVar, Union
 from urllib.parse import urljoin
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.exceptions import ProtocolError, ReadTimeoutError
+from modules.pokemon_modules.aliases import ALIAS_FILE, record_names, write_aliases
 
 # --- CẤU HÌNH ---
 MONTH = "2025-11"
 INDEX_URL = f"https://www.smogon.com/stats/{MONTH}/moveset/"
+CHAOS_INDEX_URL = f"https://www.smogon.com/stats/{MONTH}/chaos/"
+SOURCES = ("moveset", "chaos")
+# Chaos JSON dùng id (uturn, choicescarf...), lấy tên hiển thị từ data client của Showdown
+SHOWDOWN_DATA_URL = "https://play.pokemonshowdown.com/data/"
+SHOWDOWN_NAME_FILES = {"Moves": "moves.js", "Abilities": "abilities.js", "Items": "items.js"}
 OUTFILE = "pokemon_data.json"
+NDJSON_OUTFILE = "pokemon_data.ndjson"
+OUTPUT_FORMATS = ("pretty", "compact", "ndjson")
+CACHE_DIR = ".smogon_cache"  # cache HTTP trên đĩa (ETag/Last-Modified + body)
+
+USER_AGENT = "Mozilla/5.0 (compatible; smogon-stats-parser/1.0)"
+TIMEOUT = 30
+CONCURRENCY = 8       # số file tải song song tối đa
+WORKERS = 1           # số process parse; 1 = parse stream ngay trong thread tải
+MAX_RETRIES = 4
+BACKOFF_BASE = 0.5    # giây, nhân đôi sau mỗi lần thử lại
+RETRY_STATUS = {429, 500, 502, 503, 504}
+CHUNK_SIZE = 64 * 1024  # đọc body HTTP / file theo từng chunk
+GZIP_MAGIC = b"\x1f\x8b"
 
 SECTION_NAMES = {
     "Abilities", "Items", "Spreads", "Moves", 
     "Tera Types", "Teammates", "Checks and Counters"
 }
 
+COUNTERS_SECTION = "Checks and Counters"
+META_PREFIXES = ("Raw count:", "Avg. weight:", "Viability Ceiling:")
+LINE_BREAKS = "\n\r\x0b\x0c\x1c\x1d\x1e\x85\u2028\u2029"  # các ký tự str.splitlines() coi là xuống dòng
+
+# Chaos JSON -> cùng schema với moveset text (thứ tự section giống file text)
+CHAOS_PCT_SECTIONS = ("Abilities", "Items", "Spreads", "Moves", "Tera Types", "Teammates")
+CHAOS_CUTOFF = 0.95      # giữ entry tới khi đủ 95% tổng weight của section (phần còn lại là "Other")
+CHAOS_MAX_ENTRIES = 20   # tối đa số entry mỗi section
+CHAOS_TOP_N = 12         # Teammates và Checks and Counters
+CHAOS_MIN_MATCHUPS = 20  # bỏ counter có quá ít lượt gặp
+
 # --- REGEX COMPILING ---
-BORDER_RE = re.compile(r"^\+\-+\+$")
-FILENAME_RE = re.compile(r"^(?P<fmt>.+)-(?P<rating>\d+)\.txt$")
-HREF_TXT_RE = re.compile(r'href="([^"]+?\.txt)"', re.I)
+META_RE = re.compile(r"^(Raw count|Avg\. weight|Viability Ceiling):\s*(.+)$")
+COUNTER_RE = re.compile(r"^(.+?)\s+(\d+\.\d+)\s+\(")
+PCT_RE = re.compile(r"^(.*?)(\s+)([\d.]+%)$")
+FILENAME_RE = re.compile(r"^(?P<fmt>.+)-(?P<rating>\d+)\.(?:txt|json)(?:\.gz)?$")
+HREF_STATS_RE = re.compile(r'href="([^"]+?\.(?:txt|json)(?:\.gz)?)"', re.I)
+# Entry cấp một trong abilities.js / items.js / moves.js: key:{...name:"..."
+SHOWDOWN_ENTRY_RE = re.compile(r'[{,]"?([a-z0-9]+)"?:\{(?:[^{}"]|"(?:[^"\\]|\\.)*"|\{(?:[^{}]|\{[^{}]*\})*\})*?\bname:"((?:[^"\\]|\\.)*)"')
 
-def fetch_text(url: str) -> str:
-    try:
-        r = requests.get(
-            url,
-            timeout=30,
-            headers={"User-Agent": "Mozilla/5.0 (compatible; smogon-stats-parser/1.0)"},
-        )
-        r.raise_for_status()
-        r.encoding = "utf-8"
-        return r.text
-    except requests.RequestException as e:
-        print(f"[ERR] Không tải được {url}: {e}")
-        return ""
+_thread_local = threading.local()
 
-def list_txt_files(index_url: str) -> List[str]:
+def get_session() -> requests.Session:
+    """Mỗi thread giữ một Session riêng để tái sử dụng kết nối keep-alive tới host."""
+    session = getattr(_thread_local, "session", None)
+    if session is None:
+        session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=1)
+        session.mount("https://", adapter)
+        session.mount("http://", adapter)
+        session.headers["User-Agent"] = USER_AGENT
+        # Chỉ nhận gzip để tự giải nén stream được (xem iter_body)
+        session.headers["Accept-Encoding"] = "gzip"
+        _thread_local.session = session
+    return session
+
+def backoff_delay(attempt: int) -> float:
+    return BACKOFF_BASE * (2 ** attempt) + random.uniform(0, BACKOFF_BASE)
+
+T = TypeVar("T")
+
+def request_with_retries(url: str, handle: Callable[[requests.Response], T],
+                         retries: int = MAX_RETRIES) -> Optional[T]:
+    """
+    GET (stream) có retry + exponential backoff; `handle` đọc response và trả kết quả.
+    Lỗi mạng giữa chừng thì gọi lại `handle` từ đầu. Trả None nếu thất bại hẳn.
+    """
+    for attempt in range(retries + 1):
+        try:
+            headers = http_cache.conditional_headers(url) if http_cache else {}
+            with get_session().get(url, headers=headers, timeout=TIMEOUT, stream=True) as r:
+                if r.status_code in RETRY_STATUS and attempt < retries:
+                    time.sleep(backoff_delay(attempt))
+                    continue
+                r.raise_for_status()
+                return handle(r)
+        except requests.RequestException as e:
+            # 4xx (trừ 429) là lỗi cố định, thử lại cũng vô ích
+            retryable = not isinstance(e, requests.HTTPError)
+            if retryable and attempt < retries:
+                time.sleep(backoff_delay(attempt))
+                continue
+            print(f"[ERR] Không tải được {url}: {e}")
+            break
+    return None
+
+def fetch_text(url: str, retries: int = MAX_RETRIES) -> str:
+    def handle(r: requests.Response) -> str:
+        counter = {"wire": 0, "parsed": 0}
+        return b"".join(iter_body(r, counter)).decode("utf-8", errors="replace")
+    return request_with_retries(url, handle, retries) or ""
+
+class DownloadProgress:
+    """Đếm số file / số byte đã tải (thread-safe) và in tiến độ + tốc độ."""
+
+    def __init__(self, total: int):
+        self.total = total
+        self.done = 0
+        self.failed = 0
+        self.bytes = 0          # byte trên đường truyền (có thể đang nén)
+        self.parsed_bytes = 0   # byte sau giải nén đưa vào parser
+        self.started = time.monotonic()
+        self._lock = threading.Lock()
+
+    def update(self, nbytes: int, parsed_bytes: int, ok: bool = True) -> None:
+        with self._lock:
+            self.done += 1
+            self.bytes += nbytes
+            self.parsed_bytes += parsed_bytes
+            if not ok:
+                self.failed += 1
+
+    def elapsed(self) -> float:
+        return max(time.monotonic() - self.started, 1e-9)
+
+    def report(self) -> str:
+        mb = self.bytes / (1024 * 1024)
+        return (f"{self.done}/{self.total} files, {mb:.1f} MB, "
+                f"{mb / self.elapsed():.2f} MB/s, {self.done / self.elapsed():.1f} files/s")
+
+    def summary(self) -> str:
+        wire = self.bytes / (1024 * 1024)
+        parsed = self.parsed_bytes / (1024 * 1024)
+        ratio = self.parsed_bytes / self.bytes if self.bytes else 0.0
+        return (f"Bytes on wire: {wire:.1f} MB, bytes parsed: {parsed:.1f} MB "
+                f"({ratio:.1f}x), {self.failed} failed, {self.elapsed():.1f}s")
+
+class HttpCache:
+    """
+    Cache response trên đĩa theo URL: lưu body đúng như trên dây (vẫn nén nếu là gzip)
+    kèm ETag/Last-Modified. Lần sau gửi If-None-Match/If-Modified-Since, server trả 304
+    thì đọc lại body từ đĩa. Body chỉ được ghi đè khi đã tải trọn vẹn.
+    """
+
+    def __init__(self, directory: str = CACHE_DIR):
+        self.directory = directory
+        self.hits = 0       # 304, dùng lại body đã cache
+        self.stored = 0     # 200, đã ghi body mới
+        self._lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+
+    def _paths(self, url: str) -> Tuple[str, str]:
+        prepared = requests.PreparedRequest()
+        prepared.prepare_url(url, None)
+        key = hashlib.sha256(prepared.url.encode("utf-8")).hexdigest()
+        base = os.path.join(self.directory, key)
+        return base + ".body", base + ".json"
+
+    def load_meta(self, url: str) -> Optional[Dict[str, Any]]:
+        body_path, meta_path = self._paths(url)
+        if not (os.path.exists(body_path) and os.path.exists(meta_path)):
+            return None
+        try:
+            with open(meta_path, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def conditional_headers(self, url: str) -> Dict[str, str]:
+        meta = self.load_meta(url)
+        headers: Dict[str, str] = {}
+        if meta:
+            if meta.get("etag"): headers["If-None-Match"] = meta["etag"]
+            if meta.get("last_modified"): headers["If-Modified-Since"] = meta["last_modified"]
+        return headers
+
+    def read(self, url: str) -> Iterator[bytes]:
+        with self._lock:
+            self.hits += 1
+        yield from iter_file_chunks(self._paths(url)[0])
+
+    def invalidate(self, url: str) -> None:
+        """Bỏ bản cache hỏng để lần thử lại không gửi request có điều kiện (và không nhận 304)."""
+        for path in self._paths(url):
+            if os.path.exists(path):
+                os.remove(path)
+
+    def tee(self, url: str, r: requests.Response, chunks: Iterable[bytes]) -> Iterator[bytes]:
+        """Chuyển tiếp chunk cho người đọc, đồng thời ghi ra file tạm; đọc hết mới thay cache."""
+        etag = r.headers.get("ETag")
+        last_modified = r.headers.get("Last-Modified")
+        if not etag and not last_modified:
+            yield from chunks  # không có validator thì không hỏi lại có điều kiện được
+            return
+
+        body_path, meta_path = self._paths(url)
+        tmp_path = f"{body_path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        completed = False
+        try:
+            with open(tmp_path, "wb") as f:
+                for chunk in chunks:
+                    f.write(chunk)
+                    yield chunk
+            os.replace(tmp_path, body_path)
+            meta = {
+                "url": url,
+                "etag": etag,
+                "last_modified": last_modified,
+                "content_encoding": r.headers.get("Content-Encoding", ""),
+            }
+            with open(meta_path + ".tmp", "w", encoding="utf-8") as f:
+                json.dump(meta, f)
+            os.replace(meta_path + ".tmp", meta_path)
+            completed = True
+            with self._lock:
+                self.stored += 1
+        finally:
+            if not completed and os.path.exists(tmp_path):
+                os.remove(tmp_path)
+
+http_cache: Optional[HttpCache] = None  # main() bật theo --cache-dir / --no-cache
+
+def list_stat_files(index_url: str, ext: str = ".txt") -> List[str]:
+    """Danh sách file `ext` trong index, ưu tiên bản .gz nếu index có cả hai (ít byte hơn nhiều)."""
     html = fetch_text(index_url)
     if not html:
         return []
 
-    found = HREF_TXT_RE.findall(html)
-    files = []
-    seen = set()
+    found = HREF_STATS_RE.findall(html)
+    by_name: Dict[str, str] = {}
     for href in found:
-        if href.endswith(".txt.gz"): continue
         fname = href.split("/")[-1]
-        if not fname.endswith(".txt") or fname.endswith(".txt.gz"): continue
-        if fname not in seen:
-            seen.add(fname)
-            files.append(fname)
-    files.sort()
-    return files
-
-def normalize_lines(text: str) -> List[str]:
-    lines = text.splitlines()
-    out = []
-    for i, ln in enumerate(lines):
-        if i == 0: ln = ln.lstrip("\ufeff")
-        ln = ln.strip()
-        if ln: out.append(ln)
-    return out
+        base = fname[:-3] if fname.endswith(".gz") else fname
+        if not base.endswith(ext): continue
+        if base not in by_name or fname.endswith(".gz"):
+            by_name[base] = fname
+    return [by_name[base] for base in sorted(by_name)]
+
+def list_txt_files(index_url: str) -> List[str]:
+    return list_stat_files(index_url, ".txt")
+
+def gunzip_stream(chunks: Iterable[bytes]) -> Iterator[bytes]:
+    """Giải nén gzip dạng stream (kể cả nhiều member). Nếu dữ liệu không phải gzip thì trả nguyên."""
+    it = iter(chunks)
+    head = b""
+    for chunk in it:
+        head += chunk
+        if len(head) >= len(GZIP_MAGIC): break
+    if not head.startswith(GZIP_MAGIC):
+        if head: yield head
+        yield from it
+        return
+
+    d = zlib.decompressobj(16 + zlib.MAX_WBITS)
+    for chunk in itertools.chain([head], it):
+        while chunk:
+            out = d.decompress(chunk)
+            if out: yield out
+            if d.eof:
+                chunk = d.unused_data
+                d = zlib.decompressobj(16 + zlib.MAX_WBITS)
+            else:
+                chunk = b""
+    tail = d.flush()
+    if tail: yield tail
+
+def iter_body(r: requests.Response, counter: Dict[str, int]) -> Iterator[bytes]:
+    """
+    Đọc body theo chunk từ dữ liệu thô trên dây (không để requests tự giải nén), giải nén
+    Content-Encoding gzip và file .gz ngay trong stream. counter["wire"] / counter["parsed"]
+    ghi lại số byte trước / sau giải nén. Có http_cache thì body 304 đọc từ đĩa,
+    body 200 được ghi lại song song.
+    """
+    url = (r.history[0] if r.history else r).request.url
+
+    def wire() -> Iterator[bytes]:
+        # r.raw không tự đổi lỗi urllib3 thành lỗi requests như iter_content -> đổi ở đây
+        # để request_with_retries nhận ra là lỗi mạng và thử lại
+        try:
+            for chunk in r.raw.stream(CHUNK_SIZE, decode_content=False):
+                counter["wire"] += len(chunk)
+                yield chunk
+        except ProtocolError as e:
+            raise requests.exceptions.ChunkedEncodingError(e) from e
+        except ReadTimeoutError as e:
+            raise requests.exceptions.ConnectionError(e) from e
+
+    content_encoding = r.headers.get("Content-Encoding", "")
+    meta = http_cache.load_meta(url) if http_cache and r.status_code == 304 else None
+    if meta is not None:
+        # 304 Not Modified: body lấy từ cache, 0 byte trên dây
+        chunks: Iterable[bytes] = http_cache.read(url)
+        content_encoding = meta.get("content_encoding", "")
+    elif http_cache:
+        chunks = http_cache.tee(url, r, wire())
+    else:
+        chunks = wire()
+
+    if content_encoding.lower() in ("gzip", "x-gzip"):
+        chunks = gunzip_stream(chunks)
+    if r.url.endswith(".gz"):
+        chunks = gunzip_stream(chunks)
+    try:
+        for chunk in chunks:
+            counter["parsed"] += len(chunk)
+            yield chunk
+    except zlib.error as e:
+        if meta is not None:
+            http_cache.invalidate(url)
+        raise requests.exceptions.ContentDecodingError(f"{url}: {e}") from e
 
 def clean_cell(line: str) -> str:
     return line.strip().strip("|").rstrip("|").strip()
 
 def is_border(line: str) -> bool:
-    return bool(BORDER_RE.match(line.strip()))
-
-def find_headers(lines: List[str]) -> List[Tuple[int, str]]:
-    headers = []
-    for i in range(len(lines) - 2):
-        if (is_border(lines[i]) and 
-            lines[i+1].startswith("|") and lines[i+1].endswith("|") and 
-            is_border(lines[i+2])):
-            name = clean_cell(lines[i+1])
-            if name and name not in SECTION_NAMES and ":" not in name:
-                headers.append((i, name))
-    return headers
+    # Tương đương r"^\+\-+\+$" nhưng không cần chạy regex
+    line = line.strip()
+    return len(line) > 2 and line[0] == "+" and line[-1] == "+" and not line[1:-1].strip("-")
 
-def parse_block(blines: List[str]) -> Dict[str, Any]:
+def iter_lines(chunks: Iterable[Union[str, bytes]]) -> Iterator[str]:
     """
-    Parse thông tin chi tiết. 
-    LƯU Ý: Không còn chứa trường 'name' ở đây nữa.
+    Ghép các chunk (str hoặc bytes UTF-8) thành từng dòng đã strip, bỏ BOM đầu file
+    và bỏ dòng rỗng. Chỉ giữ lại phần dòng còn dang dở giữa hai chunk.
     """
-    out: Dict[str, Any] = {
-        "raw_count": None,
-        "avg_weight": None,
-        "viability_ceiling": None,
-        "sections": {},
-    }
-
-    current_section: Optional[str] = None
-    i = 0
-    while i < len(blines):
-        line = blines[i]
-        if line.startswith("|") and line.endswith("|"):
-            cell = clean_cell(line)
-
-            if cell in SECTION_NAMES:
-                current_section = cell
-                out["sections"].setdefault(current_section, [])
-                i += 1
-                continue
+    decoder = codecs.getincrementaldecoder("utf-8")()
+    pending = ""
+    at_start = True
+
+    for chunk in chunks:
+        if isinstance(chunk, bytes):
+            chunk = decoder.decode(chunk)
+        if at_start:
+            chunk = chunk.lstrip("\ufeff")
+            at_start = not chunk
+        if not chunk:
+            continue
+        text = pending + chunk
+        lines = text.splitlines()
+        # Dòng cuối chưa có ký tự xuống dòng (hoặc mới có "\r" của "\r\n") -> chờ chunk sau
+        tail = text[-1]
+        if tail == "\r":
+            pending = lines.pop() + tail
+        elif tail not in LINE_BREAKS:
+            pending = lines.pop()
+        else:
+            pending = ""
+        for ln in lines:
+            ln = ln.strip()
+            if ln: yield ln
+
+    pending += decoder.decode(b"", final=True)
+    for ln in pending.splitlines():
+        ln = ln.strip()
+        if ln: yield ln
+
+class MovesetParser:
+    """
+    State machine một lượt cho file moveset: mỗi dòng vừa được dùng để dò header
+    (border, |Tên|, border) vừa để điền record của Pokemon hiện tại, nên không cần
+    pass riêng tìm header hay cắt block. Giữ lại đúng một dòng để nhìn trước.
+
+    feed() / close() trả về (tên, record) khi một Pokemon kết thúc.
+    """
+
+    def __init__(self, detect_headers: bool = True):
+        self.detect_headers = detect_headers
+        self.name: Optional[str] = None
+        self.record: Optional[Dict[str, Any]] = None
+        self.section: Optional[List[Dict[str, Any]]] = None
+        self.section_name: Optional[str] = None
+        self.last_counter: Optional[Dict[str, Any]] = None
+        self.prev: Optional[str] = None
+        self.pending: Optional[str] = None
+        if not detect_headers:
+            self._start(None)
 
-            meta_match = re.match(r"^(Raw count|Avg\. weight|Viability Ceiling):\s*(.+)$", cell)
+    def _start(self, name: Optional[str]) -> Optional[Tuple[str, Dict[str, Any]]]:
+        done = self._finish()
+        self.name = name
+        self.record = {
+            "raw_count": None,
+            "avg_weight": None,
+            "viability_ceiling": None,
+            "sections": {},
+        }
+        self.section = None
+        self.section_name = None
+        self.last_counter = None
+        return done
+
+    def _finish(self) -> Optional[Tuple[str, Dict[str, Any]]]:
+        if self.record is None:
+            return None
+        out = self.record
+        out["sections"] = {k: v for k, v in out["sections"].items() if v}
+        self.record = None
+        return self.name, out
+
+    def _process(self, prev: Optional[str], line: str, nxt: Optional[str]) -> Optional[Tuple[str, Dict[str, Any]]]:
+        if not (line.startswith("|") and line.endswith("|")):
+            self.last_counter = None
+            return None
+        # line đã bắt đầu/kết thúc bằng "|" nên clean_cell(line) == line.strip("|").strip()
+        cell = line.strip("|").strip()
+
+        if (self.detect_headers and nxt is not None and prev is not None
+                and nxt[:1] == "+" and prev[:1] == "+"
+                and cell and cell not in SECTION_NAMES and ":" not in cell
+                and is_border(prev) and is_border(nxt)):
+            return self._start(cell)
+
+        out = self.record
+        if out is None:
+            return None
+
+        # Dòng "(xx% KOed / yy% switched out)" ngay sau một dòng counter
+        counter = self.last_counter
+        if counter is not None:
+            self.last_counter = None
+            if cell.startswith("("):
+                counter["detail"] = cell
+                return None
+
+        if cell in SECTION_NAMES:
+            self.section_name = cell
+            self.section = out["sections"].setdefault(cell, [])
+            return None
+
+        if cell.startswith(META_PREFIXES):
+            meta_match = META_RE.match(cell)
             if meta_match:
                 k, v = meta_match.group(1), meta_match.group(2).strip()
                 if k == "Raw count": out["raw_count"] = int(v.replace(",", ""))
                 elif k == "Avg. weight": out["avg_weight"] = float(v)
                 elif k == "Viability Ceiling": out["viability_ceiling"] = int(v)
-                i += 1
-                continue
+                return None
 
-            if current_section and cell:
-                if current_section == "Checks and Counters":
-                    opp_match = re.match(r"^(.+?)\s+(\d+\.\d+)\s+\(", cell)
-                    entry = {"opponent": None, "raw": cell, "detail": None}
-                    if opp_match:
-                        entry["opponent"] = opp_match.group(1).strip()
-                    
-                    if i + 1 < len(blines):
-                        nxt_line = blines[i+1]
-                        if nxt_line.startswith("|") and nxt_line.endswith("|"):
-                            nxt_cell = clean_cell(nxt_line)
-                            if nxt_cell.startswith("("):
-                                entry["detail"] = nxt_cell
-                                i += 1
-                    out["sections"][current_section].append(entry)
-                else:
-                    pct_match = re.match(r"^(.*?)(\s+)([\d.]+%)$", cell)
-                    if pct_match:
-                        out["sections"][current_section].append({
-                            "name": pct_match.group(1).strip(),
-                            "pct": float(pct_match.group(3)[:-1])
-                        })
-                    else:
-                        out["sections"][current_section].append({"raw": cell})
-        i += 1
-
-    out["sections"] = {k: v for k, v in out["sections"].items() if v}
-    return out
+        section = self.section
+        if section is None or not cell:
+            return None
+
+        if self.section_name == COUNTERS_SECTION:
+            entry = {"opponent": None, "raw": cell, "detail": None}
+            opp_match = COUNTER_RE.match(cell)
+            if opp_match:
+                entry["opponent"] = opp_match.group(1).strip()
+            section.append(entry)
+            self.last_counter = entry
+            return None
+
+        if cell.endswith("%"):
+            # Dạng phổ biến "Tên 12.345%": tách bằng chuỗi, chỉ dùng PCT_RE cho ca lạ
+            head, sep, tail = cell.rpartition(" ")
+            num = tail[:-1]
+            if sep and num.replace(".", "", 1).isdecimal():
+                section.append({"name": head.strip(), "pct": float(num)})
+                return None
+            pct_match = PCT_RE.match(cell)
+            if pct_match:
+                section.append({
+                    "name": pct_match.group(1).strip(),
+                    "pct": float(pct_match.group(3)[:-1])
+                })
+                return None
+        section.append({"raw": cell})
+        return None
+
+    def feed(self, line: str) -> Optional[Tuple[str, Dict[str, Any]]]:
+        done = None
+        if self.pending is not None:
+            done = self._process(self.prev, self.pending, line)
+        self.prev, self.pending = self.pending, line
+        return done
+
+    def close(self) -> Optional[Tuple[str, Dict[str, Any]]]:
+        # Dòng cuối không có dòng kế tiếp nên không thể là header
+        if self.pending is not None:
+            self._process(self.prev, self.pending, None)
+            self.prev = self.pending = None
+        return self._finish()
+
+def parse_block(blines: List[str]) -> Dict[str, Any]:
+    """
+    Parse thông tin chi tiết. 
+    LƯU Ý: Không còn chứa trường 'name' ở đây nữa.
+    """
+    parser = MovesetParser(detect_headers=False)
+    for line in blines:
+        parser.feed(line)
+    return parser.close()[1]
+
+def iter_smogon_text(chunks: Iterable[Union[str, bytes]]) -> Iterator[Tuple[str, Dict[str, Any]]]:
+    """Parse dạng stream: yield (tên Pokemon, record) ngay khi từng block kết thúc."""
+    parser = MovesetParser()
+    for line in iter_lines(chunks):
+        done = parser.feed(line)
+        if done is not None:
+            yield done
+    done = parser.close()
+    if done is not None:
+        yield done
+
+def iter_file_chunks(path: str, chunk_size: int = CHUNK_SIZE) -> Iterator[bytes]:
+    with open(path, "rb") as f:
+        while True:
+            chunk = f.read(chunk_size)
+            if not chunk: break
+            yield chunk
+
+def parse_smogon_file(path: str) -> Iterator[Tuple[str, Dict[str, Any]]]:
+    return iter_smogon_text(iter_file_chunks(path))
 
 def parse_smogon_text(text: str) -> Dict[str, Dict[str, Any]]:
     """
     Trả về Dictionary: {"Tauros": {...data...}, "Snorlax": {...}}
     """
-    lines = normalize_lines(text)
-    headers = find_headers(lines)
-    
-    # Đây là Dict chứa các Pokemon, key là tên Pokemon
-    pokemon_dict = {}
-    
-    for idx, (start, name) in enumerate(headers):
-        end = headers[idx + 1][0] if idx + 1 < len(headers) else len(lines)
-        block_lines = lines[start:end]
-        
-        # Gọi parse_block (không cần truyền name nữa)
-        pokemon_data = parse_block(block_lines)
-        
-        # Gán vào Dict với key là tên Pokemon
-        pokemon_dict[name] = pokemon_data
-        
-    return pokemon_dict
+    return dict(iter_smogon_text([text]))
+
+def parse_smogon_bytes(data: bytes) -> Dict[str, Dict[str, Any]]:
+    """Dùng cho worker process: nhận bytes thô của một file, trả Dict Pokemon."""
+    return dict(iter_smogon_text([data]))
+
+# --- CHAOS JSON ---
+display_names: Dict[str, Dict[str, str]] = {}  # section -> id -> tên hiển thị
+
+def set_display_names(names: Dict[str, Dict[str, str]]) -> None:
+    """Initializer cho worker process (và gọi trực tiếp khi parse trong thread)."""
+    names = dict(names)  # có thể chính là display_names (fork)
+    display_names.clear()
+    display_names.update(names)
+
+def parse_showdown_names(text: str) -> Dict[str, str]:
+    """id -> tên hiển thị từ một file data .js của Showdown (exports.BattleItems = {...})."""
+    names: Dict[str, str] = {}
+    for m in SHOWDOWN_ENTRY_RE.finditer(text):
+        names.setdefault(m.group(1), json.loads(f'"{m.group(2)}"'))
+    return names
+
+def load_display_names() -> Dict[str, Dict[str, str]]:
+    names = {}
+    for section, fname in SHOWDOWN_NAME_FILES.items():
+        text = fetch_text(urljoin(SHOWDOWN_DATA_URL, fname))
+        names[section] = parse_showdown_names(text) if text else {}
+        if not names[section]:
+            print(f"[ERR] Không lấy được tên {section} từ {fname}, giữ nguyên id")
+    return names
+
+def display_name(section: str, key: str) -> str:
+    name = display_names.get(section, {}).get(key)
+    if name: return name
+    if section == "Tera Types": return key.capitalize()
+    if key in ("", "nothing"): return "Nothing"
+    return key
+
+def chaos_pct_entries(section: str, values: Dict[str, float], total: float) -> List[Dict[str, Any]]:
+    """Entry {"name", "pct"} sắp giảm dần, cắt giống phần liệt kê trong file text."""
+    ranked = sorted(values.items(), key=lambda kv: kv[1], reverse=True)
+    limit = CHAOS_TOP_N if section == "Teammates" else CHAOS_MAX_ENTRIES
+    section_total = sum(values.values()) or 1.0
+    entries = []
+    covered = 0.0
+    for key, weight in ranked[:limit]:
+        if weight <= 0 or covered >= CHAOS_CUTOFF: break
+        entries.append({"name": display_name(section, key), "pct": 100.0 * weight / total})
+        covered += weight / section_total
+    return entries
+
+def chaos_counter_entries(matchups: Dict[str, List[float]]) -> List[Dict[str, Any]]:
+    """[n, p, d] -> entry counter; score = p - 4d như Smogon, raw cùng dạng dòng trong file text."""
+    scored = []
+    for opp, (n, p, d) in matchups.items():
+        if n < CHAOS_MIN_MATCHUPS: continue
+        scored.append((p - 4 * d, opp, p, d))
+    scored.sort(key=lambda t: t[0], reverse=True)
+    return [{
+        "opponent": opp,
+        "raw": f"{opp} {100 * score:.3f} ({100 * p:.2f}\u00b1{100 * d:.2f})",
+        "detail": None,  # chaos không tách % KO / % switch out
+    } for score, opp, p, d in scored[:CHAOS_TOP_N]]
+
+def chaos_to_records(chaos: Dict[str, Any]) -> Dict[str, Dict[str, Any]]:
+    """Chuyển một file chaos JSON thành Dict Pokemon cùng schema với parse_smogon_text."""
+    ranked = []
+    for pokemon, stats in chaos.get("data", {}).items():
+        raw_count = stats.get("Raw count")
+        # Tổng weight của Abilities = số lượt dùng có trọng số (mẫu số của mọi % trong file text)
+        total = sum((stats.get("Abilities") or {}).values())
+        ceiling = stats.get("Viability Ceiling") or []
+
+        sections: Dict[str, List[Dict[str, Any]]] = {}
+        for section in CHAOS_PCT_SECTIONS:
+            values = stats.get(section)
+            if values and total > 0:
+                entries = chaos_pct_entries(section, values, total)
+                if entries: sections[section] = entries
+        counters = chaos_counter_entries(stats.get(COUNTERS_SECTION) or {})
+        if counters: sections[COUNTERS_SECTION] = counters
+
+        ranked.append((stats.get("usage", 0.0), pokemon, {
+            "raw_count": int(raw_count) if raw_count is not None else None,
+            "avg_weight": total / raw_count if raw_count else None,
+            "viability_ceiling": int(ceiling[1]) if len(ceiling) > 1 else None,
+            "sections": sections,
+        }))
+    # File text xếp Pokemon theo usage giảm dần
+    ranked.sort(key=lambda t: t[0], reverse=True)
+    return {pokemon: record for _, pokemon, record in ranked}
+
+def parse_chaos_bytes(data: bytes) -> Dict[str, Dict[str, Any]]:
+    return chaos_to_records(json.loads(data))
+
+FetchResult = Tuple[Optional[Any], int, int]  # (kết quả hoặc None, byte trên dây, byte đã parse)
+
+def fetch_and_parse(url: str, retries: int = MAX_RETRIES) -> FetchResult:
+    """
+    Stream body HTTP (đã giải nén) thẳng vào parser, không giữ cả file trong RAM.
+    Trả về (Dict Pokemon hoặc None nếu lỗi, byte trên dây, byte đã parse).
+    """
+    def handle(r: requests.Response) -> FetchResult:
+        counter = {"wire": 0, "parsed": 0}
+        parsed = dict(iter_smogon_text(iter_body(r, counter)))
+        return parsed, counter["wire"], counter["parsed"]
+
+    return request_with_retries(url, handle, retries) or (None, 0, 0)
+
+def fetch_bytes(url: str, retries: int = MAX_RETRIES) -> FetchResult:
+    """Tải nguyên body đã giải nén (để chuyển cho process parse)."""
+    def handle(r: requests.Response) -> FetchResult:
+        counter = {"wire": 0, "parsed": 0}
+        data = b"".join(iter_body(r, counter))
+        return data, counter["wire"], counter["parsed"]
+
+    return request_with_retries(url, handle, retries) or (None, 0, 0)
+
+def fetch_and_parse_chaos(url: str, retries: int = MAX_RETRIES) -> FetchResult:
+    data, wire_bytes, parsed_bytes = fetch_bytes(url, retries)
+    if data is None:
+        return None, wire_bytes, parsed_bytes
+    return parse_chaos_bytes(data), wire_bytes, parsed_bytes
+
+# source -> (tải + parse trong thread, parse bytes trong worker process)
+SOURCE_PARSERS: Dict[str, Tuple[Callable[[str], FetchResult], Callable[[bytes], Dict[str, Any]]]] = {
+    "moveset": (fetch_and_parse, parse_smogon_bytes),
+    "chaos": (fetch_and_parse_chaos, parse_chaos_bytes),
+}
+
+def download_all(urls: List[str], concurrency: int = CONCURRENCY,
+                 fetch: Callable[[str], FetchResult] = fetch_and_parse,
+                 progress: Optional[DownloadProgress] = None):
+    """
+    Tải song song (tối đa `concurrency` request cùng lúc) bằng `fetch`; mặc định mỗi worker
+    parse ngay trong lúc stream body. Yield (url, kết quả) khi từng file xong; None nếu lỗi.
+    """
+    if progress is None:
+        progress = DownloadProgress(len(urls))
+    with ThreadPoolExecutor(max_workers=max(1, concurrency)) as executor:
+        futures = {executor.submit(fetch, url): url for url in urls}
+        for future in as_completed(futures):
+            url = futures[future]
+            try:
+                result, wire_bytes, parsed_bytes = future.result()
+            except Exception as e:
+                # Lỗi không lường trước của một file: bỏ qua file đó thay vì dừng cả lượt ingest
+                print(f"[ERR] {url}: {e!r}")
+                result, wire_bytes, parsed_bytes = None, 0, 0
+            progress.update(wire_bytes, parsed_bytes, ok=result is not None)
+            print(f"[DL] {progress.report()}")
+            yield url, result
+
+def ingest(urls: List[str], concurrency: int = CONCURRENCY, workers: int = WORKERS,
+           progress: Optional[DownloadProgress] = None,
+           source: str = "moveset") -> Iterator[Tuple[str, Optional[Dict[str, Any]]]]:
+    """
+    Yield (url, Dict Pokemon hoặc None) theo thứ tự hoàn thành.
+    workers > 1: thread chỉ tải bytes, việc parse (CPU-bound) chạy trên ProcessPoolExecutor
+    song song với các file còn đang tải.
+    """
+    fetch_and_parse_fn, parse_bytes = SOURCE_PARSERS[source]
+    if workers <= 1:
+        yield from download_all(urls, concurrency, fetch=fetch_and_parse_fn, progress=progress)
+        return
+
+    with ProcessPoolExecutor(max_workers=workers, initializer=set_display_names,
+                             initargs=(display_names,)) as pool:
+        parsing: Dict[Future, str] = {}
+        for url, data in download_all(urls, concurrency, fetch=fetch_bytes, progress=progress):
+            if data is None:
+                yield url, None
+                continue
+            parsing[pool.submit(parse_bytes, data)] = url
+            for future in [f for f in parsing if f.done()]:
+                yield parsing.pop(future), parse_result(future)
+        for future in as_completed(parsing):
+            yield parsing[future], parse_result(future)
+
+def parse_result(future: Future) -> Optional[Dict[str, Any]]:
+    try:
+        return future.result()
+    except Exception as e:
+        print(f"[ERR] Parse fail: {e!r}")
+        return None
+
+def in_order(results: Iterable[Tuple[str, Any]], order: List[str]) -> Iterator[Tuple[str, Any]]:
+    """Sắp lại kết quả (key, value) về đúng thứ tự `order`, chỉ giữ những cái về sớm."""
+    waiting: Dict[str, Any] = {}
+    pos = 0
+    for key, value in results:
+        waiting[key] = value
+        while pos < len(order) and order[pos] in waiting:
+            yield order[pos], waiting.pop(order[pos])
+            pos += 1
+
+class JsonOutputWriter:
+    """
+    Ghi output dần theo từng format/rating thay vì dựng cả data_store rồi json.dump một lần.
+
+    - pretty:  giống hệt json.dump(..., indent=2) cũ, {"pokemon": {fmt: {rating: {...}}}}
+    - compact: cùng cấu trúc, không indent / khoảng trắng
+    - ndjson:  mỗi dòng một {"format", "rating", "pokemon"} để upload_firebase đọc từng dòng
+
+    Các rating của cùng một format phải được write() liền nhau. Ghi ra file tạm,
+    close() mới thay file đích.
+    """
+
+    def __init__(self, path: str, mode: str = "pretty"):
+        if mode not in OUTPUT_FORMATS:
+            raise ValueError(f"Unknown output format: {mode}")
+        self.path = path
+        self.mode = mode
+        self.tmp_path = path + ".tmp"
+        self.f = open(self.tmp_path, "w", encoding="utf-8")
+        self.current_fmt: Optional[str] = None
+        self.first_fmt = True
+        self.first_rating = True
+        if mode == "pretty":
+            self.f.write('{\n  "pokemon": {')
+        elif mode == "compact":
+            self.f.write('{"pokemon":{')
+
+    def _dumps(self, obj: Any) -> str:
+        if self.mode == "pretty":
+            return json.dumps(obj, ensure_ascii=False, indent=2)
+        return json.dumps(obj, ensure_ascii=False, separators=(",", ":"))
+
+    def _close_fmt(self) -> None:
+        if self.current_fmt is None:
+            return
+        self.f.write("\n    }" if self.mode == "pretty" else "}")
+
+    def write(self, fmt: str, rating: str, pokemon: Dict[str, Any]) -> None:
+        if self.mode == "ndjson":
+            self.f.write(self._dumps({"format": fmt, "rating": rating, "pokemon": pokemon}) + "\n")
+            return
+
+        if fmt != self.current_fmt:
+            self._close_fmt()
+            sep = "" if self.first_fmt else ","
+            if self.mode == "pretty":
+                self.f.write(f"{sep}\n    {self._dumps(fmt)}: {{")
+            else:
+                self.f.write(f"{sep}{self._dumps(fmt)}:{{")
+            self.current_fmt = fmt
+            self.first_fmt = False
+            self.first_rating = True
+
+        sep = "" if self.first_rating else ","
+        if self.mode == "pretty":
+            body = self._dumps(pokemon).replace("\n", "\n      ")
+            self.f.write(f"{sep}\n      {self._dumps(rating)}: {body}")
+        else:
+            self.f.write(f"{sep}{self._dumps(rating)}:{self._dumps(pokemon)}")
+        self.first_rating = False
+
+    def close(self) -> None:
+        if self.mode == "pretty":
+            self._close_fmt()
+            self.f.write("}\n}" if self.first_fmt else "\n  }\n}")
+        elif self.mode == "compact":
+            self._close_fmt()
+            self.f.write("}}")
+        self.f.close()
+        os.replace(self.tmp_path, self.path)
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Tải và parse Smogon moveset stats.")
+    parser.add_argument("--source", choices=SOURCES, default="moveset",
+                        help="moveset (file text, mặc định) hoặc chaos (JSON, số liệu chính xác, không cần parse text)")
+    parser.add_argument("--concurrency", type=int, default=CONCURRENCY,
+                        help=f"Số file tải song song tối đa (mặc định {CONCURRENCY})")
+    parser.add_argument("--workers", type=int, default=WORKERS,
+                        help="Số process dùng để parse (mặc định 1 = parse trong thread tải)")
+    parser.add_argument("--cache-dir", default=CACHE_DIR,
+                        help=f"Thư mục cache HTTP (mặc định {CACHE_DIR})")
+    parser.add_argument("--no-cache", action="store_true",
+                        help="Không dùng cache, luôn tải lại toàn bộ")
+    parser.add_argument("--output-format", choices=OUTPUT_FORMATS, default="pretty",
+                        help="pretty (indent=2, như cũ), compact (không indent) hoặc ndjson (mỗi format/rating một dòng)")
+    parser.add_argument("--output", default=None,
+                        help=f"File output (mặc định {OUTFILE}, hoặc {NDJSON_OUTFILE} với ndjson)")
+    parser.add_argument("--alias-file", default=ALIAS_FILE,
+                        help=f"Bảng alias tên Smogon -> ID PokeAPI cho bot (mặc định {ALIAS_FILE})")
+    parser.add_argument("--no-aliases", action="store_true",
+                        help="Không cập nhật bảng alias")
+    return parser.parse_args()
 
 def main() -> None:
-    filenames = list_txt_files(INDEX_URL)
-    print(f"Found {len(filenames)} .txt files.")
+    global http_cache
+    args = parse_args()
+    if not args.no_cache:
+        http_cache = HttpCache(args.cache_dir)
+    if args.source == "chaos":
+        index_url, ext = CHAOS_INDEX_URL, ".json"
+        set_display_names(load_display_names())
+    else:
+        index_url, ext = INDEX_URL, ".txt"
+    filenames = list_stat_files(index_url, ext)
+    gz_count = sum(1 for f in filenames if f.endswith(".gz"))
+    print(f"Found {len(filenames)} {args.source} files ({gz_count} {ext}.gz).")
 
-    data_store: Dict[str, Dict[str, Any]] = {}
+    outfile = args.output or (NDJSON_OUTFILE if args.output_format == "ndjson" else OUTFILE)
     processed_count = 0
     skipped_count = 0
 
+    jobs: Dict[str, Tuple[str, str, str]] = {}
     for fname in filenames:
         m = FILENAME_RE.match(fname)
         if not m:
             skipped_count += 1
             continue
+        jobs[urljoin(index_url, fname)] = (fname, m.group("fmt"), m.group("rating"))
 
-        fmt = m.group("fmt")
-        rating = m.group("rating")
-        file_url = urljoin(INDEX_URL, fname)
-
-        text = fetch_text(file_url)
-        if not text:
+    # Cấu trúc: fmt -> rating -> Dict of Pokemons, bọc trong key "pokemon".
+    # Ghi theo thứ tự (format, tên file) để output không phụ thuộc thứ tự tải xong
+    # và các rating của một format luôn liền nhau.
+    order = sorted(jobs, key=lambda url: (jobs[url][1], jobs[url][0]))
+    progress = DownloadProgress(len(jobs))
+    writer = JsonOutputWriter(outfile, args.output_format)
+    alias_names: set = set()
+    results = ingest(order, args.concurrency, args.workers, progress, args.source)
+    for file_url, parsed_data in in_order(results, order):
+        fname, fmt, rating = jobs[file_url]
+        if parsed_data is None:
             skipped_count += 1
             continue
-            
-        # parsed_data bây giờ là Dict { "Tauros": {...} }
-        parsed_data = parse_smogon_text(text)
 
-        # Cấu trúc: fmt -> rating -> Dict of Pokemons
-        data_store.setdefault(fmt, {})[rating] = parsed_data
-        
+        # parsed_data là Dict { "Tauros": {...} }
+        writer.write(fmt, rating, parsed_data)
+        record_names(parsed_data, alias_names)
+
         processed_count += 1
         print(f"[OK] {fname} -> {fmt}/{rating} ({len(parsed_data)} pokemon)")
+    writer.close()
+    if not args.no_aliases:
+        write_aliases(alias_names, args.alias_file)
 
-    # Bọc trong key "pokemon"
-    final_output = {
-        "pokemon": data_store
-    }
-
-    with open(OUTFILE, "w", encoding="utf-8") as f:
-        json.dump(final_output, f, ensure_ascii=False, indent=2)
-
-    print(f"\nDONE: Processed {processed_count}, Skipped {skipped_count}. Saved to {OUTFILE}")
+    print(f"\nDONE: Processed {processed_count}, Skipped {skipped_count}. Saved to {outfile}")
+    print(progress.summary())
+    if http_cache:
+        print(f"HTTP cache: {http_cache.hits} not modified (304), {http_cache.stored} updated")
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
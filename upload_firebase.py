@@ -1,81 +1,447 @@
+import argparse
+import hashlib
 import json
+import os
+import random
+import sqlite3
+import sys
+import threading
 import time
+from concurrent.futures import ThreadPoolExecutor
 import requests
+from requests.adapters import HTTPAdapter
+from modules.pokemon_modules.aggregate import ALL_RATING, aggregate_format, usage_order
+from modules.storage import sanitize_key
 
-FIREBASE_URL = "https://vo-robin-default-rtdb.asia-southeast1.firebasedatabase.app"
+# Đặt FIREBASE_URL (hoặc --firebase-url) để upload vào database khác, vd. firebase_emulator.py
+FIREBASE_URL = os.getenv("FIREBASE_URL", "https://vo-robin-default-rtdb.asia-southeast1.firebasedatabase.app")
 JSON_FILE = "pokemon_data.json"
+# pokemonusage/{fmt}/{rating}: danh sách tên theo usage (Firebase trả key theo thứ tự chữ cái)
+USAGE_ROOT = "pokemonusage"
 
 TIMEOUT = 120
-SLEEP = 0.5 
+CONCURRENCY = 8       # số request upload song song tối đa
+MAX_RETRIES = 4
+BACKOFF_BASE = 0.5    # giây, nhân đôi sau mỗi lần thử lại
+RETRY_STATUS = {429, 500, 502, 503, 504}
+UPLOAD_MODES = ("put", "patch")
+BATCH_BYTES = 4 * 1024 * 1024  # kích thước payload mục tiêu cho mỗi request PATCH nhiều path
+MANIFEST_FILE = ".upload_manifest.json"  # hash nội dung của từng path đã upload
+CHECKPOINT_EVERY = 5.0  # giây giữa hai lần ghi manifest ra đĩa
 
-def sanitize_key(key: str) -> str:
+_session = None
+_session_lock = threading.Lock()
+# --sqlite: ghi vào storage cục bộ (modules/storage) thay vì gửi lên Firebase
+local_storage = None
+
+def get_session(pool_size: int = CONCURRENCY) -> requests.Session:
+    """Một Session dùng chung cho mọi thread, pool đủ kết nối keep-alive cho `pool_size` request song song."""
+    global _session
+    with _session_lock:
+        if _session is None:
+            _session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+            _session.mount("https://", adapter)
+            _session.mount("http://", adapter)
+            _session.headers["Content-Type"] = "application/json"
+        return _session
+
+def backoff_delay(attempt: int) -> float:
+    return BACKOFF_BASE * (2 ** attempt) + random.uniform(0, BACKOFF_BASE)
+
+class UploadStats:
+    """Đếm request / byte / lỗi (thread-safe) để in tổng kết cuối cùng."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.start = time.perf_counter()
+        self.requests = 0
+        self.ok = 0
+        self.failed = 0
+        self.retries = 0
+        self.bytes = 0
+        self.batches = 0
+        self.batches_failed = 0
+        self.skipped = 0
+
+    def add(self, **counts) -> None:
+        with self.lock:
+            for k, v in counts.items():
+                setattr(self, k, getattr(self, k) + v)
+
+    def summary(self) -> str:
+        elapsed = max(time.perf_counter() - self.start, 1e-9)
+        mb = self.bytes / (1024 * 1024)
+        return (f"Batches: {self.batches - self.batches_failed} ok, {self.batches_failed} failed. "
+                f"Skipped {self.skipped} unchanged pokemons. "
+                f"Requests: {self.requests} ({self.ok} ok, {self.failed} failed, {self.retries} retries). "
+                f"Sent {mb:.1f} MB in {elapsed:.1f}s ({mb / elapsed:.2f} MB/s, {self.requests / elapsed:.1f} req/s)")
+
+stats = UploadStats()
+
+class UploadManifest:
     """
-    Firebase không cho phép các ký tự: . $ # [ ] / hoặc ký tự điều khiển ASCII 0-31 or 127.
-    Trong Pokemon data, phổ biến nhất là dấu chấm (.) trong 'Mr. Mime', 'Mime Jr.'
+    Hash nội dung của từng path pokemondata/{fmt}/{rating}/{pokemon} đã upload thành công.
+    Lần chạy sau bỏ qua path không đổi; ghi checkpoint định kỳ nên chạy lại sau khi
+    crash sẽ tiếp tục từ chỗ đã dừng. Manifest gắn với FIREBASE_URL.
     """
-    # Thay thế dấu chấm bằng chuỗi rỗng (Mr. Mime -> Mr Mime) hoặc ký tự khác
-    return key.replace(".", "").replace("#", "").replace("$", "").replace("[", "").replace("]", "").replace("/", "")
 
-def upload(path: str, data):
+    def __init__(self, path: str = MANIFEST_FILE, full: bool = False):
+        self.path = path
+        self.lock = threading.Lock()
+        self.hashes = {}
+        self.dirty = False
+        self.last_save = time.monotonic()
+        if full or not os.path.exists(path):
+            return
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                saved = json.load(f)
+        except (OSError, ValueError) as e:
+            print(f"[ERR] Manifest {path} hỏng, upload lại toàn bộ: {e}")
+            return
+        if saved.get("firebase_url") != FIREBASE_URL:
+            print(f"[ERR] Manifest {path} thuộc database khác, upload lại toàn bộ")
+            return
+        # "pokemondata/{fmt}/{rating}" -> {pokemon: hash}
+        self.hashes = saved.get("hashes", {})
+        total = sum(len(names) for names in self.hashes.values())
+        print(f"Manifest: {total} paths đã upload trước đó.")
+
+    @staticmethod
+    def digest(body: bytes) -> str:
+        return hashlib.sha256(body).hexdigest()
+
+    def changed(self, path: str, digest: str) -> bool:
+        prefix, _, name = path.rpartition("/")
+        with self.lock:
+            return self.hashes.get(prefix, {}).get(name) != digest
+
+    def stale_paths(self, prefix: str, keep) -> list:
+        """Path dưới `prefix` đã upload trước đây nhưng không còn trong `keep`."""
+        with self.lock:
+            return [f"{prefix}/{name}" for name in self.hashes.get(prefix, {}) if name not in keep]
+
+    def mark(self, entries: dict) -> None:
+        """Ghi nhận path -> hash sau khi upload thành công (hash None = path đã bị xoá)."""
+        with self.lock:
+            for path, digest in entries.items():
+                prefix, _, name = path.rpartition("/")
+                names = self.hashes.setdefault(prefix, {})
+                if digest is None: names.pop(name, None)
+                else: names[name] = digest
+            self.dirty = True
+        self.checkpoint()
+
+    def checkpoint(self, force: bool = False) -> None:
+        with self.lock:
+            if not self.dirty or (not force and time.monotonic() - self.last_save < CHECKPOINT_EVERY):
+                return
+            tmp_path = self.path + ".tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump({"firebase_url": FIREBASE_URL, "hashes": self.hashes}, f, ensure_ascii=False)
+            os.replace(tmp_path, self.path)
+            self.dirty = False
+            self.last_save = time.monotonic()
+
+def dumps_bytes(data) -> bytes:
+    return json.dumps(data, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+def upload(path: str, data, retries: int = MAX_RETRIES) -> bool:
+    """PUT `data` lên `path`."""
+    return send("PUT", path, dumps_bytes(data), retries)
+
+def send(method: str, path: str, body: bytes, retries: int = MAX_RETRIES, label: str = None) -> bool:
+    """Gửi body JSON đã encode; retry + exponential backoff khi lỗi mạng hoặc 429/5xx."""
+    label = label or path
+    if local_storage is not None:
+        return send_local(method, path, body, label)
     url = f"{FIREBASE_URL}/{path}.json"
+    for attempt in range(retries + 1):
+        stats.add(requests=1, bytes=len(body))
+        try:
+            r = get_session().request(method, url, data=body, timeout=TIMEOUT)
+            if r.status_code in RETRY_STATUS and attempt < retries:
+                raise requests.HTTPError(f"{r.status_code} {r.reason}", response=r)
+            r.raise_for_status()
+            stats.add(ok=1)
+            print(f"[OK] Uploaded success: {label}")
+            return True
+        except requests.RequestException as e:
+            status = e.response.status_code if e.response is not None else None
+            if attempt < retries and (status is None or status in RETRY_STATUS):
+                stats.add(retries=1)
+                time.sleep(backoff_delay(attempt))
+                continue
+            stats.add(failed=1)
+            print(f"[ERR] Failed to upload {label}: {e}")
+            return False
+    return False
+
+def send_local(method: str, path: str, body: bytes, label: str) -> bool:
+    stats.add(requests=1, bytes=len(body))
     try:
-        r = requests.put(url, json=data, timeout=TIMEOUT)
-        r.raise_for_status()
-        print(f"[OK] Uploaded success: {path}")
-        return True
-    except requests.RequestException as e:
-        print(f"[ERR] Failed to upload {path}: {e}")
+        local_storage.apply("patch" if method == "PATCH" else "put", path, json.loads(body))
+    except (sqlite3.Error, ValueError) as e:
+        stats.add(failed=1)
+        print(f"[ERR] Failed to write {label}: {e}")
         return False
+    stats.add(ok=1)
+    print(f"[OK] Written: {label}")
+    return True
 
-def main():
-    print(f"Reading {JSON_FILE}...")
-    try:
-        with open(JSON_FILE, "r", encoding="utf-8") as f:
-            raw_file_content = json.load(f)
-    except FileNotFoundError:
-        print("Lỗi: Không tìm thấy file JSON.")
+def is_ndjson(path: str) -> bool:
+    return path.endswith((".ndjson", ".jsonl"))
+
+def iter_format_ratings(path: str):
+    """
+    Yield (fmt, rating, pokemons_dict) từ output của smogon_fetch.
+    File .ndjson/.jsonl được đọc từng dòng nên không phải load cả tháng vào RAM.
+    """
+    if is_ndjson(path):
+        with open(path, "r", encoding="utf-8") as f:
+            for line in f:
+                if not line.strip(): continue
+                row = json.loads(line)
+                yield row["format"], row["rating"], row["pokemon"]
         return
 
+    with open(path, "r", encoding="utf-8") as f:
+        raw_file_content = json.load(f)
     if "pokemon" not in raw_file_content:
-        print("Lỗi cấu trúc: File JSON thiếu key gốc 'pokemon'.")
-        return
+        raise ValueError("File JSON thiếu key gốc 'pokemon'.")
 
     data = raw_file_content["pokemon"]
-    print(f"Found {len(data)} formats. Starting upload...")
-
+    print(f"Found {len(data)} formats.")
     for fmt, ratings in data.items():
         for rating, pokemons_dict in ratings.items():
-            path = f"pokemondata/{fmt}/{rating}"
-            
-            # --- BƯỚC QUAN TRỌNG: LÀM SẠCH KEY TRƯỚC KHI UPLOAD ---
-            clean_dict = {}
-            for poke_name, poke_data in pokemons_dict.items():
-                safe_name = sanitize_key(poke_name)
-                
-                # Cập nhật lại field "name" bên trong data luôn cho đồng bộ (nếu cần)
-                if isinstance(poke_data, dict):
-                    poke_data["name"] = safe_name 
-                    
-                clean_dict[safe_name] = poke_data
-            # -------------------------------------------------------
-
-            count = len(clean_dict)
-            print(f" -> Uploading {fmt}/{rating} ({count} pokemons)...")
-            
-            # Thử upload cả cục (Batch)
-            success = upload(path, clean_dict)
-            
-            # Nếu upload cả cục vẫn lỗi (ví dụ file quá nặng), chuyển sang upload từng con
-            if not success:
-                print(f"   ⚠️ Batch upload failed. Switching to item-by-item upload for {fmt}/{rating}...")
-                for p_name, p_data in clean_dict.items():
-                    sub_path = f"{path}/{p_name}"
-                    upload(sub_path, p_data)
-                    time.sleep(0.1) # Nghỉ cực ngắn để không spam
-
-            time.sleep(SLEEP)
+            yield fmt, rating, pokemons_dict
+
+def clean_pokemons(pokemons_dict: dict) -> dict:
+    # --- BƯỚC QUAN TRỌNG: LÀM SẠCH KEY TRƯỚC KHI UPLOAD ---
+    clean_dict = {}
+    for poke_name, poke_data in pokemons_dict.items():
+        safe_name = sanitize_key(poke_name)
+
+        # Cập nhật lại field "name" bên trong data luôn cho đồng bộ (nếu cần)
+        if isinstance(poke_data, dict):
+            poke_data["name"] = safe_name 
+
+        clean_dict[safe_name] = poke_data
+    # -------------------------------------------------------
+    return clean_dict
+
+def with_all_ratings(items):
+    """
+    Sau rating cuối của mỗi format, thêm (fmt, "all", trung bình có trọng số qua các rating)
+    để bot chỉ cần đọc một lần thay vì tính lúc tra cứu. Các rating của một format phải liền
+    nhau (smogon_fetch luôn ghi như vậy); chỉ giữ trong RAM một format mỗi lúc.
+    """
+    current_fmt = None
+    buffered = {}
+    for fmt, rating, pokemons_dict in items:
+        if fmt != current_fmt:
+            if buffered: yield current_fmt, ALL_RATING, aggregate_format(buffered)
+            current_fmt, buffered = fmt, {}
+        if rating == ALL_RATING: continue  # file đã có "all" cũ -> tính lại
+        # Tính trên key đã sanitize, đúng như data bot đọc từ Firebase
+        pokemons_dict = clean_pokemons(pokemons_dict)
+        buffered[rating] = pokemons_dict
+        yield fmt, rating, pokemons_dict
+    if buffered: yield current_fmt, ALL_RATING, aggregate_format(buffered)
+
+def usage_record(fmt: str, rating: str, clean_dict: dict):
+    """(path, JSON bytes, hash) của danh sách tên theo usage, bot dùng để xếp hạng autocomplete."""
+    value = dumps_bytes(usage_order(rating, clean_dict))
+    return f"{USAGE_ROOT}/{fmt}/{rating}", value, UploadManifest.digest(value)
+
+def upload_usage(fmt: str, rating: str, clean_dict: dict, manifest: UploadManifest = None) -> bool:
+    path, value, digest = usage_record(fmt, rating, clean_dict)
+    if manifest and not manifest.changed(path, digest): return True
+    success = send("PUT", path, value)
+    if success and manifest:
+        manifest.mark({path: digest})
+    return success
+
+def upload_format_rating(fmt: str, rating: str, pokemons_dict: dict, manifest: UploadManifest = None):
+    path = f"pokemondata/{fmt}/{rating}"
+    clean_dict = clean_pokemons(pokemons_dict)
+    # Danh sách usage lỗi thì bot không thấy rating mới -> tính là batch lỗi dù data đã lên
+    usage_ok = upload_usage(fmt, rating, clean_dict, manifest)
+    if not usage_ok:
+        print(f"   ⚠️ Usage list upload failed for {fmt}/{rating}")
+
+    digests = {f"{path}/{name}": UploadManifest.digest(dumps_bytes(data)) for name, data in clean_dict.items()}
+    if manifest:
+        digests.update(dict.fromkeys(manifest.stale_paths(path, clean_dict), None))
+        if not any(manifest.changed(p, d) if d else True for p, d in digests.items()):
+            stats.add(skipped=len(clean_dict))
+            print(f"[SKIP] {fmt}/{rating} unchanged")
+            if not usage_ok: stats.add(batches=1, batches_failed=1)
+            return usage_ok
+
+    count = len(clean_dict)
+    print(f" -> Uploading {fmt}/{rating} ({count} pokemons)...")
+
+    # Thử upload cả cục (Batch)
+    success = upload(path, clean_dict)
+    if success and manifest:
+        manifest.mark(digests)
+
+    # Nếu upload cả cục vẫn lỗi (ví dụ file quá nặng), chuyển sang upload từng con
+    if not success:
+        print(f"   ⚠️ Batch upload failed. Switching to item-by-item upload for {fmt}/{rating}...")
+        success = True
+        for p_name, p_data in clean_dict.items():
+            sub_path = f"{path}/{p_name}"
+            if not upload(sub_path, p_data):
+                success = False
+            elif manifest:
+                manifest.mark({sub_path: digests[sub_path]})
+
+    success = success and usage_ok
+    stats.add(batches=1, batches_failed=0 if success else 1)
+    return success
+
+def iter_patch_records(items, manifest: UploadManifest = None):
+    """
+    Yield (path, JSON bytes hoặc b"null", hash hoặc None) cho từng Pokemon cần gửi.
+    Có manifest: bỏ qua Pokemon không đổi, và xoá (null) Pokemon đã upload trước đây
+    nhưng không còn trong format/rating đó.
+    """
+    for fmt, rating, pokemons_dict in items:
+        prefix = f"pokemondata/{fmt}/{rating}"
+        clean_dict = clean_pokemons(pokemons_dict)
+        path, value, digest = usage_record(fmt, rating, clean_dict)
+        if not manifest or manifest.changed(path, digest):
+            yield path, value, digest
+        for safe_name, poke_data in clean_dict.items():
+            path = f"{prefix}/{safe_name}"
+            value = dumps_bytes(poke_data)
+            digest = UploadManifest.digest(value)
+            if manifest and not manifest.changed(path, digest):
+                stats.add(skipped=1)
+                continue
+            yield path, value, digest
+        if manifest:
+            for path in manifest.stale_paths(prefix, clean_dict):
+                yield path, b"null", None
+
+def iter_patch_batches(items, batch_bytes: int = BATCH_BYTES, manifest: UploadManifest = None):
+    """
+    Gom record của từng Pokemon thành body PATCH nhiều path ở root
+    ({"pokemondata/fmt/rating/Pokemon": {...}, ...}), mỗi body tối đa ~`batch_bytes`.
+    Record nào một mình đã lớn hơn `batch_bytes` thì đi riêng một request.
+    Yield (label, body, {path: hash}).
+    """
+    parts = []
+    digests = {}
+    size = 2  # "{" + "}"
+    first = last = None
+    for path, value, digest in iter_patch_records(items, manifest):
+        part = dumps_bytes(path) + b":" + value
+        if parts and size + len(part) + 1 > batch_bytes:
+            yield f"PATCH {first} .. {last}", b"{" + b",".join(parts) + b"}", digests
+            parts, digests, size, first = [], {}, 2, None
+        parts.append(part)
+        digests[path] = digest
+        size += len(part) + 1
+        first = first or path
+        last = path
+    if parts:
+        yield f"PATCH {first} .. {last}", b"{" + b",".join(parts) + b"}", digests
+
+def upload_patch_batch(label: str, body: bytes, digests: dict, manifest: UploadManifest = None) -> bool:
+    success = send("PATCH", "", body, label=f"{label} ({len(digests)} pokemons, {len(body) / 1024:.0f} KB)")
+    if success and manifest:
+        manifest.mark(digests)
+    stats.add(batches=1, batches_failed=0 if success else 1)
+    return success
+
+def upload_all(items, concurrency: int = CONCURRENCY, mode: str = "put",
+               batch_bytes: int = BATCH_BYTES, manifest: UploadManifest = None) -> None:
+    """
+    Upload song song. put: mỗi (fmt, rating) một PUT; patch: các PATCH nhiều path
+    ~`batch_bytes` mỗi request. Chỉ giữ tối đa `concurrency` batch đang chờ upload
+    nên file NDJSON vẫn được đọc dần. Có manifest thì chỉ gửi phần thay đổi.
+    """
+    if mode == "patch":
+        jobs = ((upload_patch_batch, (*batch, manifest), batch[0])
+                for batch in iter_patch_batches(items, batch_bytes, manifest))
+    else:
+        jobs = ((upload_format_rating, (*item, manifest), f"{item[0]}/{item[1]}") for item in items)
+
+    get_session(concurrency)
+    slots = threading.BoundedSemaphore(concurrency)
+
+    def job_done(future, label: str) -> None:
+        slots.release()
+        error = future.exception()
+        if error is not None:
+            # Lỗi ngoài dự kiến (manifest, storage cục bộ...): batch coi như thất bại, không mất dấu
+            print(f"[ERR] {label}: {error!r}")
+            stats.add(batches=1, batches_failed=1)
+
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        for fn, job_args, label in jobs:
+            slots.acquire()
+            future = executor.submit(fn, *job_args)
+            future.add_done_callback(lambda f, label=label: job_done(f, label))
+
+def main():
+    global FIREBASE_URL, local_storage
+    parser = argparse.ArgumentParser(description="Upload output của smogon_fetch lên Firebase.")
+    parser.add_argument("file", nargs="?", default=JSON_FILE,
+                        help=f"File JSON hoặc NDJSON (mặc định {JSON_FILE})")
+    parser.add_argument("--concurrency", type=int, default=CONCURRENCY,
+                        help=f"Số request upload song song tối đa (mặc định {CONCURRENCY})")
+    parser.add_argument("--mode", choices=UPLOAD_MODES, default="put",
+                        help="put: ghi đè cả format/rating (mặc định); patch: gom nhiều Pokemon vào "
+                             "PATCH nhiều path (không xoá Pokemon cũ không còn trong file)")
+    parser.add_argument("--batch-bytes", type=int, default=BATCH_BYTES,
+                        help=f"Kích thước payload mục tiêu cho --mode patch (mặc định {BATCH_BYTES})")
+    parser.add_argument("--manifest", default=MANIFEST_FILE,
+                        help=f"File manifest hash để chỉ upload phần thay đổi (mặc định {MANIFEST_FILE})")
+    parser.add_argument("--full", action="store_true",
+                        help="Bỏ qua manifest cũ, upload lại toàn bộ (manifest vẫn được ghi mới)")
+    parser.add_argument("--no-manifest", action="store_true",
+                        help="Không đọc / ghi manifest")
+    parser.add_argument("--no-aggregate", action="store_true",
+                        help=f"Không tính sẵn rating \"{ALL_RATING}\" cho mỗi format")
+    parser.add_argument("--firebase-url", default=FIREBASE_URL,
+                        help="Root URL của Realtime Database (mặc định biến môi trường FIREBASE_URL hoặc database thật)")
+    parser.add_argument("--sqlite", metavar="FILE",
+                        help="Ghi vào file SQLite (bot chạy với STORAGE_BACKEND=sqlite) thay vì Firebase")
+    args = parser.parse_args()
+    FIREBASE_URL = args.firebase_url.rstrip("/")
+    if args.sqlite:
+        from modules.storage.sqlite import SQLiteStorage
+        local_storage = SQLiteStorage(args.sqlite)
+        # Manifest gắn với nơi ghi: file SQLite là một "database" khác
+        FIREBASE_URL = f"sqlite:{os.path.abspath(args.sqlite)}"
+
+    manifest = None if args.no_manifest else UploadManifest(args.manifest, full=args.full)
+    print(f"Reading {args.file}... Starting upload...")
+    try:
+        items = iter_format_ratings(args.file)
+        if not args.no_aggregate: items = with_all_ratings(items)
+        upload_all(items, max(1, args.concurrency), args.mode, args.batch_bytes, manifest)
+    except FileNotFoundError:
+        print("Lỗi: Không tìm thấy file JSON.")
+        sys.exit(1)
+    except ValueError as e:
+        print(f"Lỗi cấu trúc: {e}")
+        sys.exit(1)
+    finally:
+        if manifest: manifest.checkpoint(force=True)
+        if local_storage is not None: local_storage.close_sync()
 
+    if stats.batches_failed:
+        print(f"\nDONE with errors: {stats.batches_failed} batch upload failed.")
+        print(stats.summary())
+        sys.exit(1)
     print("\nDONE: All data processed.")
+    print(stats.summary())
 
 if __name__ == "__main__":
     main()
\ No newline at end of file